@@ -1,8 +1,22 @@
+import re
 import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
-from typing import Dict, List, Optional
-import re
+from typing import Dict, List, Mapping, Optional
+from urllib.parse import urlencode, urlsplit
+
+import batch
+import html_parse
+import http_cache
+import http_client
+import metrics
+import news_item
+import parse_pool
+import preview
+import singleflight
+import sources
+import streaming
+import text_extract
 
 
 URL_POLITICS = "https://ria.ru/politics/"
@@ -18,12 +32,16 @@ URL_HEALTH = "https://ria.ru/health/"
           'date': 'ДД.ММ.ГГГГ' или 'ГГГГ-ММ-ДД',
           'time': 'ЧЧ:ММ' или '',
           'image': 'URL картинки или относительный путь',
-          'link': 'URL полной версии новости'
+          'link': 'URL полной версии новости',
+          'published': 'ГГГГ-ММ-ДДTЧЧ:ММ:СС+03:00' или '' (дата и время в поясе Москвы, см. timestamps.py)
       },
       ...
   ]
 }
 
+Карточки - news_item.NewsItem: компактный объект, который читается как словарь выше
+(item['title'], item.get('image'), dict(item)).
+
 !!!! ФУНКЦИИ 
 
 
@@ -31,6 +49,9 @@ URL_HEALTH = "https://ria.ru/health/"
 
 - get_full_article_text_politics(url): принимает URL полной версии новости с ria.ru/politics/, возвращает строку с полным текстом статьи.
 
+- get_full_article_texts_politics(links, max_workers=8, per_host=2): принимает ссылки (или словари из news['news']),
+  качает статьи параллельно и отдаёт пары (ссылка, текст) по мере готовности
+
 - get_article_preview_politics(url, preview_length=300): Принимает максимальную длину превью и url полной версии новости с ria.ru/politics/,
   возвращает строку с кратким текстовым превью статьи
 	
@@ -41,6 +62,9 @@ URL_HEALTH = "https://ria.ru/health/"
 
 - get_full_article_text_science(url): принимает URL полной версии новости с ria.ru/science/, возвращает строку с полным текстом статьи.
 
+- get_full_article_texts_science(links, max_workers=8, per_host=2): принимает ссылки (или словари из news['news']),
+  качает статьи параллельно и отдаёт пары (ссылка, текст) по мере готовности
+
 - get_article_preview_science(url, preview_length=300): Принимает максимальную длину превью и url полной версии новости с ria.ru/science/,
   возвращает строку с кратким текстовым превью статьи
 
@@ -51,6 +75,9 @@ URL_HEALTH = "https://ria.ru/health/"
 
 - get_full_article_text_health(url): принимает URL полной версии новости с ria.ru/health/, возвращает строку с полным текстом статьи.
 
+- get_full_article_texts_health(links, max_workers=8, per_host=2): принимает ссылки (или словари из news['news']),
+  качает статьи параллельно и отдаёт пары (ссылка, текст) по мере готовности
+
 - get_article_preview_health(url, preview_length=300): Принимает максимальную длину превью и url полной версии новости с ria.ru/health/,
   возвращает строку с кратким текстовым превью статьи
 
@@ -60,12 +87,20 @@ URL_HEALTH = "https://ria.ru/health/"
  
 class NewsParser:   ///   Универсальный парсер новостей с RIA.ru
 
+RIA: описание разметки RIA (sources.Source): селекторы карточек, полей и текста статьи
+
+_ria_next_page(url, page, news) -> Optional[str]: адрес подгрузки следующих новостей раздела
+  (/services/<раздел>/more.html?id=...&date=... по последней карточке предыдущей страницы)
+
 
 !!!!  МЕТОД   ///   что делает               
 
 
 get_today_date(self) -> str:   ///   Возвращает сегодняшнюю дату в формате ДД.ММ.ГГГГ
 
+_fetch_page(self, url: str, ttl: float = 0, stop=None) -> Optional[http_cache.Page]:   ///   Условный HTTP запрос через дисковый кэш (None - сайт недоступен и копии нет;
+    stop - streaming.ContainerStop, чтение страницы обрывается после контейнера статьи)
+
 _make_request(self, url: str) -> Optional[BeautifulSoup]:   ///   Выполняет HTTP запрос и возвращает BeautifulSoup объект
 
 _extract_time_from_text(self, time_text: str) -> str:   ///   Извлекает время из текста в формате ЧЧ:ММ
@@ -78,16 +113,28 @@ _extract_link(self, item) -> Optional[str]:   ///   Извлекает и нор
 
 _extract_title(self, item) -> Optional[str]:   ///   Извлекает заголовок новости
 
-parse_latest_news(self, url: str, category: str = "general") -> Dict[str, List]:   ///   Основная функция парсинга новостей
+parse_latest_news(self, url: str, category: str = "general") -> Dict[str, List]:   ///   Основная функция парсинга новостей (одновременные вызовы для одного URL объединяются)
+
+_load_latest_news(self, url: str) -> Dict[str, List]:   ///   Скачивает и разбирает ленту (без объединения вызовов)
+
+_parse_news_items(self, soup) -> Dict[str, List]:   ///   Разбирает карточки новостей из страницы раздела
+
+_build_news_item(self, item) -> Optional[Dict[str, str]]:   ///   Собирает словарь одной новости из карточки
 
 _is_table_of_contents(self, text: str) -> bool:   ///   Определяет, является ли текст оглавлением
 
 _extract_news_preview(self, text: str, preview_length: int = 300) -> str:   ///   Извлекает превью новости, пропуская оглавление
 
-get_full_article_text(self, url: str, preserve_formatting: bool = True) -> str:   ///   Получает полный текст статьи с сохранением форматирования
+get_full_article_text(self, url: str, preserve_formatting: bool = True) -> str:   ///   Получает полный текст статьи с сохранением форматирования (одновременные вызовы объединяются)
+
+_load_article_text(self, url: str, preserve_formatting: bool = True) -> str:   ///   Скачивает и разбирает статью (без объединения вызовов)
+
+_extract_article_text(self, soup, preserve_formatting: bool = True) -> str:   ///   Извлекает текст статьи из разобранной страницы
 
 get_article_preview(self, url: str, preview_length: int = 300) -> str:   ///   Получает превью статьи без оглавления
 
+_extract_article_preview(self, soup, preview_length: int = 300) -> str:   ///   Превью из разобранной страницы без извлечения всего текста
+
 _extract_formatted_text(self, content_div) -> str:   ///   Извлекает текст с сохранением форматирования и переносов строк
 
 """
@@ -95,23 +142,28 @@ _extract_formatted_text(self, content_div) -> str:   ///   Извлекает т
 
 class NewsParser:
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, client: Optional[http_client.HttpClient] = None):
+        # Общий с остальными парсерами клиент: пулы соединений, таймауты, повторы
+        self.client = client or http_client.client
+        self.session = self.client.session
     
     def get_today_date(self) -> str:
         return datetime.now().strftime("%d.%m.%Y")
     
-    def _make_request(self, url: str) -> Optional[BeautifulSoup]:
+    def _fetch_page(self, url: str, ttl: float = 0, stop=None) -> Optional[http_cache.Page]:
+        # Сетевые сбои (таймаут, истёкший срок, разомкнутый предохранитель) - None,
+        # если нет сохранённой копии; ошибки разбора и кода не скрываются
         try:
-            response = self.session.get(url)
-            response.encoding = 'utf-8'
-            return BeautifulSoup(response.text, 'lxml')
-        except Exception:
+            return self.client.fetch_page(url, 'utf-8', ttl, stop)
+        except requests.RequestException:
             return None
     
+    def _make_request(self, url: str) -> Optional[BeautifulSoup]:
+        page = self._fetch_page(url)
+        if not page:
+            return None
+        return BeautifulSoup(page.text, 'lxml')
+    
     def _extract_time_from_text(self, time_text: str) -> str:
         time_clean = ''
         colon_found = False
@@ -138,14 +190,7 @@ class NewsParser:
     def _parse_date_time(self, item) -> tuple[str, str]:
         date, time = '', ''
         
-        date_selectors = ['.cell-info__date', '[data-type="date"]', '.list-item__info']
-        date_element = None
-        
-        for selector in date_selectors:
-            date_element = item.select_one(selector)
-            if date_element:
-                break
-        
+        date_element = RIA.first(item, 'date')
         if not date_element:
             return date, time
         
@@ -176,21 +221,21 @@ class NewsParser:
         image = ''
         
         # Поиск в специализированных контейнерах для science
-        img_container = item.select_one('.cell-list__item-img')
+        img_container = RIA.first(item, 'image_container')
         if img_container:
-            img_tag = img_container.select_one('img')
+            img_tag = RIA.first(img_container, 'image')
             if img_tag:
                 image = img_tag.get('src') or img_tag.get('data-src') or ''
         
         # Поиск в обычных img тегах
         if not image:
-            img_tag = item.select_one('img')
+            img_tag = RIA.first(item, 'image')
             if img_tag:
                 image = img_tag.get('src') or img_tag.get('data-src') or ''
         
         # Поиск в background-image стилях
         if not image:
-            div_with_bg = item.select_one('[style*="background-image"]')
+            div_with_bg = RIA.first(item, 'image_background')
             if div_with_bg and div_with_bg.get('style'):
                 style = div_with_bg['style']
                 if 'url(' in style:
@@ -200,19 +245,13 @@ class NewsParser:
                         image = style[start+4:end].strip('"\'')
         
         # Нормализация URL изображения
-        if image:
-            if image.startswith('//'):
-                image = 'https:' + image
-            elif image.startswith('/'):
-                image = 'https://ria.ru' + image
-        
-        return image
+        return RIA.normalize_url(image, RIA.image_base)
     
     def _extract_link(self, item) -> Optional[str]:
         link = item.get('href', '')
         
         if not link:
-            link_tag = item.select_one('a[href]')
+            link_tag = RIA.first(item, 'link')
             if link_tag:
                 link = link_tag.get('href', '')
         
@@ -220,28 +259,10 @@ class NewsParser:
             return None
         
         # Нормализация URL
-        if link.startswith('/'):
-            link = 'https://ria.ru' + link
-        elif link.startswith('//'):
-            link = 'https:' + link
-        
-        return link
+        return RIA.normalize_url(link, RIA.link_base)
     
     def _extract_title(self, item) -> Optional[str]:
-        title_selectors = [
-            '.cell-list__item-title', 
-            '.list-item__title', 
-            'h2', 
-            'h3',
-            '.news-item__title'
-        ]
-        
-        title_tag = None
-        for selector in title_selectors:
-            title_tag = item.select_one(selector)
-            if title_tag:
-                break
-        
+        title_tag = RIA.first(item, 'title')
         if not title_tag:
             title_tag = item
         
@@ -249,220 +270,199 @@ class NewsParser:
         return title if title and len(title) >= 10 else None
     
     def parse_latest_news(self, url: str, category: str = "general") -> Dict[str, List]:
-        soup = self._make_request(url)
-        if not soup:
+        # Одновременные вызовы для одного URL (потоки Flask, обновление лент) ждут один запрос и один разбор
+        return singleflight.flights.do(('ria_news', url), lambda: self._load_latest_news(url))
+    
+    def _load_latest_news(self, url: str) -> Dict[str, List]:
+        page = self._fetch_page(url)
+        if not page:
             return {'news': []}
         
-        news_dict = {'news': []}
-        seen_links = set()
+        # На 304 от сайта разбор не повторяется - берётся сохранённый словарь news
+        # Разбор может выполняться в пуле процессов (parse_pool), туда уходят сырые байты
+        # (из дискового кэша он приходит обычными словарями - приводим к NewsItem)
+        return news_item.wrap_news(
+            page.extract('news', lambda: parse_pool.run(_extract_news_bytes, page.body, page.encoding)))
+    
+    def _parse_news_items(self, soup) -> Dict[str, List]:
+        # Поиск карточек, нормализация ссылок и удаление дублей - в общем движке sources
+        return RIA.extract_news(soup, self._build_news_item)
+    
+    def _build_news_item(self, item) -> Optional[Dict[str, str]]:
+        # Извлечение заголовка
+        title = self._extract_title(item)
+        if not title:
+            return None
         
-        # Селекторы для элементов новостей
-        item_selectors = ['.cell-list__item', '.list-item', '.news-item', '[data-type="news"]']
-        items = []
+        # Извлечение и проверка ссылки
+        link = self._extract_link(item)
+        if not link:
+            return None
         
-        for selector in item_selectors:
-            found_items = soup.select(selector)
-            if found_items:
-                items.extend(found_items)
+        # Парсинг даты и времени
+        date, time = self._parse_date_time(item)
         
-        for item in items:
-            try:
-                # Извлечение заголовка
-                title = self._extract_title(item)
-                if not title:
-                    continue
-                
-                # Извлечение и проверка ссылки
-                link = self._extract_link(item)
-                if not link or link in seen_links:
-                    continue
-                seen_links.add(link)
-                
-                # Парсинг даты и времени
-                date, time = self._parse_date_time(item)
-                
-                # Извлечение изображения
-                image = self._extract_image_url(item)
-                
-                # Добавление новости в результат
-                news_dict['news'].append({
-                    'title': title,
-                    'date': date,
-                    'time': time,
-                    'image': image,
-                    'link': link
-                })
-                
-            except Exception:
-                continue
+        # Извлечение изображения
+        image = self._extract_image_url(item)
         
-        return news_dict
+        return {
+            'title': title,
+            'date': date,
+            'time': time,
+            'image': image,
+            'link': link
+        }
     
     def _is_table_of_contents(self, text: str) -> bool:
-        toc_indicators = [
-            'оглавление', 'содержание', 'содержит', 'в статье', 
-            'читайте также', 'table of contents', 'toc',
-            'введение', 'заголовок', 'раздел', 'часть', 'глава'
-        ]
-        
-        text_lower = text.lower().strip()
-        if len(text_lower) < 50:  # Слишком короткий текст для содержания
-            return False
-            
-        # Проверяем наличие маркеров оглавления
-        for indicator in toc_indicators:
-            if indicator in text_lower:
-                return True
-        
-        # Проверяем паттерны типа "1. Заголовок", "Раздел 1" и т.д.
-        toc_patterns = [
-            r'^\d+\.\s',  # "1. Текст"
-            r'^[ivx]+\.\s',  # "I. Текст", "II. Текст"
-            r'^раздел\s+\d+',  # "Раздел 1"
-            r'^часть\s+\d+',  # "Часть 1"
-            r'^глава\s+\d+',  # "Глава 1"
-        ]
-        
-        first_line = text_lower.split('\n')[0] if '\n' in text_lower else text_lower
-        for pattern in toc_patterns:
-            if re.search(pattern, first_line):
-                return True
-        
-        return False
+        return preview.is_table_of_contents(text)
     
     def _extract_news_preview(self, text: str, preview_length: int = 300) -> str:
-        lines = text.split('\n')
-        news_lines = []
-        
-        # Пропускаем оглавление и находим начало новости
-        skip_toc = True
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            if skip_toc:
-                if self._is_table_of_contents(line):
-                    continue
-                # Если нашли строку, которая не является оглавлением, начинаем собирать новость
-                if len(line) > 50 and not self._is_table_of_contents(line):
-                    skip_toc = False
-                    news_lines.append(line)
-            else:
-                news_lines.append(line)
-        
-        # Если все строки были оглавлением, используем оригинальный текст
-        if not news_lines:
-            news_lines = [line.strip() for line in lines if line.strip()]
-        
-        # Формируем превью
-        preview_text = ' '.join(news_lines)
-        
-        # Обрезаем до нужной длины, но не обрезаем середину слова
-        if len(preview_text) > preview_length:
-            preview_text = preview_text[:preview_length]
-            last_space = preview_text.rfind(' ')
-            if last_space > preview_length * 0.7:  # Обрезаем только если есть подходящее место
-                preview_text = preview_text[:last_space]
-            preview_text += '...'
-        
-        return preview_text
+        return preview.preview_from_text(text, preview_length)
     
     def get_full_article_text(self, url: str, preserve_formatting: bool = True) -> str:
-        soup = self._make_request(url)
-        if not soup:
+        return singleflight.flights.do(('ria_text', url, preserve_formatting),
+                                       lambda: self._load_article_text(url, preserve_formatting))
+    
+    def _load_article_text(self, url: str, preserve_formatting: bool = True) -> str:
+        # Статьи после публикации почти не меняются - в пределах ARTICLE_TTL берём их из кэша;
+        # со страницы нужен только текст - после контейнера статьи чтение обрывается
+        page = self._fetch_page(url, http_cache.ARTICLE_TTL, streaming.container_stop(RIA))
+        if not page:
             return ''
         
-        content_selectors = [
-            'div.article__body',
-            'div.article__text',
-            'article',
-            '.content',
-            '.post-content',
-            '[class*="article"]',
-            '[class*="content"]'
-        ]
-        
-        for selector in content_selectors:
-            content_div = soup.select_one(selector)
-            if content_div:
-                # Удаление ненужных элементов
-                unwanted_selectors = [
-                    'script', 'style', '.ad', '.banner', '.social', '.share',
-                    '.article__info', '.article__meta', '.article__tags',
-                    '.recommended', '.related', '.comments', '.advertisement'
-                ]
-                
-                for unwanted in unwanted_selectors:
-                    for elem in content_div.select(unwanted):
-                        elem.decompose()
-                
-                if preserve_formatting:
-                    # Сохранение форматирования с переносами строк
-                    return self._extract_formatted_text(content_div)
-                else:
-                    # Старый метод (простой текст)
-                    text = content_div.get_text().strip()
-                    if len(text) > 100:
-                        return text
+        kind = 'text_formatted' if preserve_formatting else 'text'
+        return page.extract(kind, lambda: parse_pool.run(_extract_article_bytes, page.body, page.encoding,
+                                                         preserve_formatting))
+    
+    def _extract_article_text(self, soup, preserve_formatting: bool = True) -> str:
+        for content_div in RIA.iter_content(soup):
+            # Удаление ненужных элементов
+            RIA.remove_unwanted(content_div)
+            
+            if preserve_formatting:
+                # Сохранение форматирования с переносами строк
+                return self._extract_formatted_text(content_div)
+            else:
+                # Старый метод (простой текст)
+                text = content_div.get_text().strip()
+                if len(text) > 100:
+                    return text
         
         return ''
     
     def get_article_preview(self, url: str, preview_length: int = 300) -> str:
-        full_text = self.get_full_article_text(url, preserve_formatting=True)
-        if not full_text:
+        # Для превью хватает начала текста: чтение обрывается, набрав его с запасом
+        stop = streaming.container_stop(RIA, preview_length * streaming.PREVIEW_FACTOR)
+        page = self._fetch_page(url, http_cache.ARTICLE_TTL, stop)
+        if not page:
             return ''
         
-        return self._extract_news_preview(full_text, preview_length)
-    
-    def _extract_formatted_text(self, content_div) -> str:
-        # Временная копия для работы
-        temp_div = BeautifulSoup(content_div.prettify(), 'lxml')
-        
-        # Обработка заголовков - добавляем переносы строк
-        for tag in temp_div.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            tag.insert_after('\n\n')
-            tag.insert_before('\n\n')
+        # Текст статьи уже разобран - превью из него, без повторного разбора страницы
+        if page.not_modified and 'text_formatted' in page.extracted:
+            return self._extract_news_preview(page.extracted['text_formatted'], preview_length)
         
-        # Обработка параграфов - добавляем переносы строк
-        for tag in temp_div.find_all('p'):
-            tag.insert_after('\n\n')
-        
-        # Обработка списков
-        for tag in temp_div.find_all(['ul', 'ol']):
-            tag.insert_after('\n')
-            for li in tag.find_all('li'):
-                li.insert_after('\n')
-        
-        # Обработка div'ов с контентом
-        for tag in temp_div.find_all('div'):
-            if tag.get_text(strip=True):
-                # Проверяем, не является ли div контейнером для нескольких элементов
-                child_tags = tag.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol'])
-                if not child_tags:
-                    tag.insert_after('\n')
-        
-        # Получаем текст и очищаем его
-        text = temp_div.get_text()
-        
-        # Очистка лишних пробелов и нормализация переносов
-        lines = []
-        for line in text.splitlines():
-            line = line.strip()
-            if line:  # пропускаем пустые строки
-                lines.append(line)
-        
-        # Объединяем с правильными переносами
-        formatted_text = '\n'.join(lines)
-        
-        # Убираем множественные переносы (больше 2 подряд)
-        formatted_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', formatted_text)
+        return page.extract(f'preview_{preview_length}',
+                            lambda: parse_pool.run(_extract_preview_bytes, page.body, page.encoding, preview_length))
+    
+    def _extract_article_preview(self, soup, preview_length: int = 300) -> str:
+        for content_div in RIA.iter_content(soup):
+            RIA.remove_unwanted(content_div)
+            # Обход дерева останавливается, как только набрано preview_length символов
+            return preview.extract_preview(text_extract.iter_lines(content_div), preview_length)
         
-        return formatted_text.strip()
-
+        return ''
+    
+    def _extract_formatted_text(self, content_div) -> str:
+        # Один проход по дереву вместо prettify() + повторного разбора и пяти find_all
+        return text_extract.formatted_text(content_div)
+
+
+# Ссылка на новость RIA: /20251010/slug-2046543210.html - дата и id материала
+RIA_ARTICLE_ID_RE = re.compile(r'/(\d{8})/[^/]*?-?(\d+)\.html')
+
+
+def _ria_next_page(url: str, page: int, news: List[Mapping]) -> Optional[str]:
+    # Кнопка "Ещё" раздела подгружает новости старше последней показанной:
+    # её id и время публикации - из последней карточки предыдущей страницы
+    for item in reversed(news):
+        match = RIA_ARTICLE_ID_RE.search(item.get('link', ''))
+        if not match:
+            continue
+        published = item.get('published', '')
+        date = (published[:19].replace('-', '').replace(':', '') if published
+                else match.group(1) + 'T235959')
+        section_path = urlsplit(url).path.strip('/')
+        query = urlencode({'id': match.group(2), 'date': date})
+        return f'https://ria.ru/services/{section_path}/more.html?{query}'
+    return None
+
+
+# Описание разметки RIA для общего движка (селекторы компилируются один раз)
+RIA = sources.register(sources.Source(
+    'ria',
+    encoding='utf-8',
+    cards=['.cell-list__item', '.list-item', '.news-item', '[data-type="news"]'],
+    fields={
+        'title': ['.cell-list__item-title', '.list-item__title', 'h2', 'h3', '.news-item__title'],
+        'link': ['a[href]'],
+        'date': ['.cell-info__date', '[data-type="date"]', '.list-item__info'],
+        'image_container': ['.cell-list__item-img'],
+        'image': ['img'],
+        'image_background': ['[style*="background-image"]'],
+    },
+    link_base='https://ria.ru',
+    image_base='https://ria.ru',
+    content=[
+        'div.article__body',
+        'div.article__text',
+        'article',
+        '.content',
+        '.post-content',
+        '[class*="article"]',
+        '[class*="content"]'
+    ],
+    unwanted=[
+        'script', 'style', '.ad', '.banner', '.social', '.share',
+        '.article__info', '.article__meta', '.article__tags',
+        '.recommended', '.related', '.comments', '.advertisement'
+    ],
+    dedup_links=True,
+    skip_errors=True,
+    # Адрес кнопки "Ещё" не сверен с сохранёнными страницами RIA: включается через PAGINATION_SOURCES
+    next_page=_ria_next_page,
+))
 
 parser = NewsParser()
 
+
+# Точки входа для воркеров parse_pool: байты страницы -> словарь news / текст статьи
+
+def _extract_news_bytes(body: bytes, encoding: str) -> Dict[str, List]:
+    metrics.PARSE_BYTES.inc(len(body), source=RIA.name)
+    with metrics.stage(RIA.name, 'parse'):
+        # В режиме partial дерево строится только для карточек (см. html_parse);
+        # байты декодирует сам lxml
+        soup = html_parse.make_soup(body, RIA.strainer, encoding=encoding)
+    with metrics.stage(RIA.name, 'extract'):
+        news = parser._parse_news_items(soup)
+    metrics.PARSE_CARDS.inc(len(news['news']), source=RIA.name)
+    return news
+
+def _parse_article_bytes(body: bytes, encoding: str) -> BeautifulSoup:
+    metrics.PARSE_BYTES.inc(len(body), source=RIA.name)
+    with metrics.stage(RIA.name, 'parse'):
+        return html_parse.make_soup(body, encoding=encoding)
+
+def _extract_article_bytes(body: bytes, encoding: str, preserve_formatting: bool = True) -> str:
+    soup = _parse_article_bytes(body, encoding)
+    with metrics.stage(RIA.name, 'extract'):
+        return parser._extract_article_text(soup, preserve_formatting)
+
+def _extract_preview_bytes(body: bytes, encoding: str, preview_length: int = 300) -> str:
+    soup = _parse_article_bytes(body, encoding)
+    with metrics.stage(RIA.name, 'extract'):
+        return parser._extract_article_preview(soup, preview_length)
+
 """
 ===============================
 ===       POLITICS       ===
@@ -475,6 +475,9 @@ def parse_latest_news_politics(url=URL_POLITICS):
 def get_full_article_text_politics(url):
     return parser.get_full_article_text(url)
 
+def get_full_article_texts_politics(links, max_workers=batch.MAX_WORKERS, per_host=batch.PER_HOST):
+    return batch.fetch_articles(links, get_full_article_text_politics, max_workers, per_host)
+
 def get_article_preview_politics(url, preview_length=300):
     return parser.get_article_preview(url, preview_length)
 
@@ -492,6 +495,9 @@ def parse_latest_news_science(url=URL_SCIENCE):
 def get_full_article_text_science(url):
     return parser.get_full_article_text(url)
 
+def get_full_article_texts_science(links, max_workers=batch.MAX_WORKERS, per_host=batch.PER_HOST):
+    return batch.fetch_articles(links, get_full_article_text_science, max_workers, per_host)
+
 def get_article_preview_science(url, preview_length=300):
     return parser.get_article_preview(url, preview_length)
 
@@ -509,6 +515,9 @@ def parse_latest_news_health(url=URL_HEALTH):
 def get_full_article_text_health(url):
     return parser.get_full_article_text(url)
 
+def get_full_article_texts_health(links, max_workers=batch.MAX_WORKERS, per_host=batch.PER_HOST):
+    return batch.fetch_articles(links, get_full_article_text_health, max_workers, per_host)
+
 def get_article_preview_health(url, preview_length=300):
     return parser.get_article_preview(url, preview_length)
 
@@ -1,5 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
+import batch
+import html_parse
+import http_cache
+import http_client
+import metrics
+import news_item
+import parse_pool
+import singleflight
+import sources
+import streaming
+import timestamps
 
 
 URL_SPORT = "https://www.sport.ru"
@@ -14,23 +23,65 @@ URL_IT = "https://habr.com/ru/news/top/daily/"
           'date': 'ДД.ММ.ГГГГ' или 'ГГГГ-ММ-ДД',
           'time': 'ЧЧ:ММ' или '',
           'image': 'URL картинки или относительный путь',
-          'link': 'URL полной версии новости'
+          'link': 'URL полной версии новости',
+          'published': 'ГГГГ-ММ-ДДTЧЧ:ММ:СС+03:00' или '' (дата и время в поясе Москвы, см. timestamps.py)
       },
       ...
   ]
 }
 
+Карточки - news_item.NewsItem: компактный объект, который читается как словарь выше
+(item['title'], item.get('image'), dict(item)).
+
 - parse_latest_news_sport(url): принимает URL sport.ru (URL_SPORT), возвращает словарь news (см. выше)
 - get_full_article_text_sport(url): принимает URL полной версии новости с Sport.ru, возвращает строку с полным текстом статьи.
+- get_full_article_texts_sport(links, max_workers=8, per_host=2): принимает ссылки (или словари из news['news']),
+  качает статьи параллельно и отдаёт пары (ссылка, текст) по мере готовности
 
 - parse_latest_news_education(url): принимает URL раздела новостей k-obr.spb.ru (URL_EDUCATION), возвращает словарь news (см. выше)
 - get_full_article_text_education(url): принимает URL конкретной новости k-obr.spb.ru, возвращает строку с полным текстом статьи.
+- get_full_article_texts_education(links, max_workers=8, per_host=2): то же для нескольких статей, пары (ссылка, текст)
 
 - parse_latest_news_it(url): принимает URL ленты статей Habr (URL_IT), возвращает словарь news (см. выше)
 - get_full_article_text_it(url): принимает URL статьи Habr, возвращает строку с полным текстом статьи.
+- get_full_article_texts_it(links, max_workers=8, per_host=2): то же для нескольких статей, пары (ссылка, текст)
+
+Разметка каждого сайта описана объектами sources.Source (SPORT, SPORT_MAIN, EDUCATION, IT):
+селекторы карточек и полей компилируются один раз, карточки разбирает общий движок sources.
 """
 
 
+def _parse_page(url, source, extract, ttl=0, partial=False, stream=False):
+    # Все запросы идут через общий клиент: keep-alive, таймауты, повторы, лимит на хост.
+    # Если страница не менялась (304 или свежая копия моложе ttl) - берём прошлый результат разбора.
+    # partial - лента: в режиме partial строится дерево только для карточек источника.
+    # stream - статья: чтение страницы обрывается после контейнера текста (streaming.py).
+    # Сам разбор может выполняться в пуле процессов (parse_pool), туда уходят сырые байты.
+    # Одновременные вызовы для одной страницы ждут один запрос и один разбор
+    return singleflight.flights.do((url, extract.__name__),
+                                   lambda: _load_page(url, source, extract, ttl, partial, stream))
+
+def _load_page(url, source, extract, ttl=0, partial=False, stream=False):
+    stop = streaming.container_stop(source) if stream else None
+    page = http_client.fetch_page(url, source.encoding, ttl, stop)
+    result = page.extract(extract.__name__, lambda: parse_pool.run(
+        _extract_bytes, page.body, page.encoding, source.name, extract, partial))
+    # Ленты из дискового кэша приходят обычными словарями - приводим карточки к NewsItem
+    return news_item.wrap_news(result) if isinstance(result, dict) else result
+
+def _extract_bytes(body, encoding, source_name, extract, partial=False):
+    cards = sources.SOURCES[source_name].strainer if partial else None
+    metrics.PARSE_BYTES.inc(len(body), source=source_name)
+    with metrics.stage(source_name, 'parse'):
+        # Байты декодирует сам lxml (для sport.ru - из windows-1251), без промежуточной str
+        soup = html_parse.make_soup(body, cards, encoding=encoding)
+    with metrics.stage(source_name, 'extract'):
+        result = extract(soup)
+    if isinstance(result, dict):
+        metrics.PARSE_CARDS.inc(len(result['news']), source=source_name)
+    return result
+
+
 """
 ===============================
 ===          SPORT          ===
@@ -38,87 +89,79 @@ URL_IT = "https://habr.com/ru/news/top/daily/"
 """
 
 def parse_main_news_sport(url):
-    response = requests.get(url)
-    response.encoding = 'windows-1251'
-    soup = BeautifulSoup(response.text, 'lxml')
+    return _parse_page(url, SPORT_MAIN, _extract_main_news_sport, partial=True)
 
-    news_dict = {'news': []}
-    articles = soup.select('div.articles-item.articles-item-large')
-
-    for article in articles:
-        title_tag = article.select_one('h3 a')
-        date_tag = article.select_one('span.date')
-        img_tag = article.select_one('div.articles-item-image a img')
-        link_tag = article.select_one('div.articles-item-image a')
-
-        if not (title_tag and date_tag and img_tag and link_tag):
-            continue
-
-        date_time_str = date_tag.text.strip()
-        if ',' in date_time_str:
-            date, time = map(str.strip, date_time_str.split(',', 1))
-        else:
-            date, time = date_time_str, ''
-
-        news_dict['news'].append({
-            'title': title_tag.text.strip(),
-            'date': date,
-            'time': time,
-            'image': img_tag['src'],
-            'link': link_tag['href']
-        })
-
-    return news_dict
+def _extract_main_news_sport(soup):
+    return SPORT_MAIN.extract_news(soup)
 
 def parse_latest_news_sport(url):
-    response = requests.get(url)
-    response.encoding = 'windows-1251'
-    soup = BeautifulSoup(response.text, 'lxml')
-
-    news_dict = {'news': []}
-    wrappers = soup.select('div.lst-itm, div.lst-itm.lst-itm-hid')
-
-    for wrapper in wrappers:
-        article = wrapper.select_one('div.articles-item.articles-item-large')
-        if not article:
-            continue
-
-        title_tag = article.select_one('h3 a')
-        date_tag = article.select_one('span.date')
-        img_tag = article.select_one('div.articles-item-image a img')
-        link_tag = article.select_one('div.articles-item-image a')
-
-        if not (title_tag and date_tag and img_tag and link_tag):
-            continue
-
-        date_time_str = date_tag.text.strip()
-        if ',' in date_time_str:
-            date, time = map(str.strip, date_time_str.split(',', 1))
-        else:
-            date, time = date_time_str, ''
-
-        news_dict['news'].append({
-            'title': title_tag.text.strip(),
-            'date': date,
-            'time': time,
-            'image': img_tag['src'],
-            'link': link_tag['href']
-        })
-
-    return news_dict
+    return _parse_page(url, SPORT, _extract_latest_news_sport, partial=True)
+
+def _extract_latest_news_sport(soup):
+    return SPORT.extract_news(soup)
+
+def _build_sport_item(article):
+    title_tag = SPORT.first(article, 'title')
+    date_tag = SPORT.first(article, 'date')
+    img_tag = SPORT.first(article, 'image')
+    link_tag = SPORT.first(article, 'link')
+
+    if not (title_tag and date_tag and img_tag and link_tag):
+        return None
+
+    date_time_str = date_tag.text.strip()
+    if ',' in date_time_str:
+        date, time = map(str.strip, date_time_str.split(',', 1))
+    else:
+        date, time = date_time_str, ''
+
+    return {
+        'title': title_tag.text.strip(),
+        'date': date,
+        'time': time,
+        'image': img_tag['src'],
+        'link': link_tag['href']
+    }
 
 def get_full_article_text_sport(url):
-    response = requests.get(url)
-    response.encoding = 'windows-1251'
-    soup = BeautifulSoup(response.text, 'lxml')
+    return _parse_page(url, SPORT, _extract_article_text_sport, ttl=http_cache.ARTICLE_TTL, stream=True)
+
+def get_full_article_texts_sport(links, max_workers=batch.MAX_WORKERS, per_host=batch.PER_HOST):
+    return batch.fetch_articles(links, get_full_article_text_sport, max_workers, per_host)
 
-    content_div = soup.find('div', class_='article-text clearfix')
+def _extract_article_text_sport(soup):
+    content_div = SPORT.find_content(soup)
     if not content_div:
         return ''
 
     article_text = content_div.get_text().strip()
     return article_text[39:]
 
+SPORT = sources.register(sources.Source(
+    'sport',
+    encoding='windows-1251',
+    cards=['div.lst-itm, div.lst-itm.lst-itm-hid'],
+    item='div.articles-item.articles-item-large',
+    fields={
+        'title': ['h3 a'],
+        'date': ['span.date'],
+        'image': ['div.articles-item-image a img'],
+        'link': ['div.articles-item-image a'],
+    },
+    build=_build_sport_item,
+    content=['div.article-text.clearfix'],
+    # Схема не сверена с сохранёнными страницами sport.ru: включается через PAGINATION_SOURCES
+    next_page=sources.query_pages('page'),
+))
+
+# Главная sport.ru: те же карточки, но без обёрток div.lst-itm
+SPORT_MAIN = sources.register(sources.Source(
+    'sport_main',
+    encoding='windows-1251',
+    cards=['div.articles-item.articles-item-large'],
+    build=_build_sport_item,
+))
+
 """
 ===============================
 ===        EDUCATION        ===
@@ -141,57 +184,73 @@ RU_MONTHS = {
 }
 
 def parse_latest_news_education(url_base):
-    response = requests.get(url_base)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'lxml')
-
-    news_dict = {'news': []}
-    items = soup.select('div.news__item.card')
-
-    for item in items:
-        title_tag = item.select_one('h2.news__title a')
-        link_tag = item.select_one('a.news__link')
-        date_parts = item.select('div.news__date .d-inline')
-
-        if not (title_tag and link_tag and date_parts and len(date_parts) >= 3):
-            continue
-
-        day = date_parts[0].get_text(strip=True)
-        month_ru = date_parts[1].get_text(strip=True).lower()
-        year = date_parts[2].get_text(strip=True)
-        month = RU_MONTHS.get(month_ru, '01')
-        date = f'{day.zfill(2)}.{month}.{year}'
-
-        style = link_tag.get('style', '')
-        image = ''
-        if "background-image" in style:
-            start = style.find("url(")
-            end = style.find(")", start + 4)
-            if start != -1 and end != -1:
-                image = style[start + 4:end].strip().strip('"').strip("'")
-
-        news_dict['news'].append({
-            'title': title_tag.get_text(strip=True),
-            'date': date,
-            'time': '',
-            'image': image,
-            'link': title_tag['href']
-        })
-
-    return news_dict
+    return _parse_page(url_base, EDUCATION, _extract_latest_news_education, partial=True)
+
+def _extract_latest_news_education(soup):
+    return EDUCATION.extract_news(soup)
+
+def _build_education_item(item):
+    title_tag = EDUCATION.first(item, 'title')
+    link_tag = EDUCATION.first(item, 'link')
+    date_parts = EDUCATION.select(item, 'date_parts')
+
+    if not (title_tag and link_tag and date_parts and len(date_parts) >= 3):
+        return None
+
+    day = date_parts[0].get_text(strip=True)
+    month_ru = date_parts[1].get_text(strip=True).lower()
+    year = date_parts[2].get_text(strip=True)
+    month = RU_MONTHS.get(month_ru, '01')
+    date = f'{day.zfill(2)}.{month}.{year}'
+
+    style = link_tag.get('style', '')
+    image = ''
+    if "background-image" in style:
+        start = style.find("url(")
+        end = style.find(")", start + 4)
+        if start != -1 and end != -1:
+            image = style[start + 4:end].strip().strip('"').strip("'")
+
+    return {
+        'title': title_tag.get_text(strip=True),
+        'date': date,
+        'time': '',
+        'image': image,
+        'link': title_tag['href']
+    }
 
 def get_full_article_text_education(url):
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'lxml')
+    return _parse_page(url, EDUCATION, _extract_article_text_education, ttl=http_cache.ARTICLE_TTL, stream=True)
+
+def get_full_article_texts_education(links, max_workers=batch.MAX_WORKERS, per_host=batch.PER_HOST):
+    return batch.fetch_articles(links, get_full_article_text_education, max_workers, per_host)
 
-    container = soup.find('article', class_='article mb-32')
+def _extract_article_text_education(soup):
+    container = EDUCATION.find_content(soup)
     if not container:
         return ''
 
     text = container.get_text().strip()
     return text
 
+EDUCATION = sources.register(sources.Source(
+    'education',
+    encoding='utf-8',
+    cards=['div.news__item.card'],
+    fields={
+        'title': ['h2.news__title a'],
+        'link': ['a.news__link'],
+        'date_parts': ['div.news__date .d-inline'],
+    },
+    build=_build_education_item,
+    # Ссылки и картинки в карточках относительные (/o-komitete/news/0/)
+    link_base='https://k-obr.spb.ru',
+    image_base='https://k-obr.spb.ru',
+    content=['article.article.mb-32'],
+    # Битрикс: постраничная навигация ?PAGEN_1=N (не сверена с сохранёнными страницами k-obr)
+    next_page=sources.query_pages('PAGEN_1'),
+))
+
 """
 ===============================
 ===            IT           ===
@@ -199,80 +258,95 @@ def get_full_article_text_education(url):
 """
 
 def parse_latest_news_it(url):
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'lxml')
-
-    news = {'news': []}
-    items = soup.select('article.tm-articles-list__item, article.tm-articles-listitem')
-
-    for item in items:
-        title_tag = item.select_one('h2.tm-title a.tm-title__link, h2.tm-title a.tm-titlelink')
-        time_tag = item.select_one('a.tm-article-datetime-published time, time.tm-article-datetime-published')
-        img_tag = item.select_one('img.tm-article-snippet__lead-image, img.tm-article-snippetlead-image')
-        if not title_tag:
-            # Альтернативная разметка карточки
-            title_tag = item.select_one('a[data-test-id="article-snippet-title-link"]')
-        if not (title_tag and time_tag):
-            continue
-
-        title = title_tag.get_text(strip=True)
-        link = title_tag.get('href', '')
-        if link and link.startswith('/'):
-            # Habr: относительная ссылка
-            link = 'https://habr.com' + link
-
-        # Время берём из атрибута title или datetime
-        date = ''
-        time = ''
-        dt_title = time_tag.get('title')
-        dt_attr = time_tag.get('datetime')
-        dt_text = (dt_title or dt_attr or '').strip()
-        if dt_text:
-            # Форматы типа "2025-10-01, 07:13" или ISO
-            if ',' in dt_text:
-                d, t = dt_text.split(',', 1)
-                date, time = d.strip(), t.strip()
-            elif 'T' in dt_text and 'Z' in dt_text:
-                # ISO: 2025-10-01T07:13:26.000Z
-                iso = dt_text.replace('Z', '')
-                parts = iso.split('T', 1)
-                if len(parts) == 2:
-                    date, time = parts[0], parts[1][:5]
-            else:
-                date = dt_text
-
-        image = ''
-        if img_tag and img_tag.get('src'):
-            image = img_tag['src']
-            if image.startswith('//'):
-                image = 'https:' + image
-
-        news['news'].append({
-            'title': title,
-            'date': date,
-            'time': time,
-            'image': image,
-            'link': link
-        })
-
-    return news
+    return _parse_page(url, IT, _extract_latest_news_it, partial=True)
+
+def _extract_latest_news_it(soup):
+    return IT.extract_news(soup)
+
+def _build_it_item(item):
+    title_tag = IT.first(item, 'title')
+    time_tag = IT.first(item, 'time')
+    img_tag = IT.first(item, 'image')
+    if not (title_tag and time_tag):
+        return None
+
+    title = title_tag.get_text(strip=True)
+    # Habr: относительная ссылка дополняется до https://habr.com (см. link_base)
+    link = title_tag.get('href', '')
+
+    # Время берём из атрибута title или datetime
+    date = ''
+    time = ''
+    dt_title = time_tag.get('title')
+    dt_attr = time_tag.get('datetime')
+    dt_text = (dt_title or dt_attr or '').strip()
+    if dt_text:
+        # Форматы типа "2025-10-01, 07:13" или ISO
+        if ',' in dt_text:
+            d, t = dt_text.split(',', 1)
+            date, time = d.strip(), t.strip()
+        elif 'T' in dt_text and 'Z' in dt_text:
+            # ISO: 2025-10-01T07:13:26.000Z
+            iso = dt_text.replace('Z', '')
+            parts = iso.split('T', 1)
+            if len(parts) == 2:
+                date, time = parts[0], parts[1][:5]
+        else:
+            date = dt_text
+
+    image = ''
+    if img_tag and img_tag.get('src'):
+        image = img_tag['src']
+
+    # ISO-время Habr - в UTC: переводим в Москву сами, а не из date/time (см. timestamps.py)
+    published = timestamps.from_iso(dt_attr or '')
+
+    return {
+        'title': title,
+        'date': date,
+        'time': time,
+        'image': image,
+        'link': link,
+        'published': timestamps.to_iso(published) if published and published.tzinfo else ''
+    }
 
 def get_full_article_text_it(url):
-    response = requests.get(url)
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'lxml')
+    return _parse_page(url, IT, _extract_article_text_it, ttl=http_cache.ARTICLE_TTL, stream=True)
 
-    container = soup.select_one('#post-content-body .article-formatted-body, .article-formatted-body')
-    if not container:
-        container = soup.select_one('div.article-body, article.tm-article-presenter__content')
+def get_full_article_texts_it(links, max_workers=batch.MAX_WORKERS, per_host=batch.PER_HOST):
+    return batch.fetch_articles(links, get_full_article_text_it, max_workers, per_host)
 
+def _extract_article_text_it(soup):
+    container = IT.find_content(soup)
     if not container:
         return ''
 
     text = container.get_text().strip()
     return text
 
+IT = sources.register(sources.Source(
+    'it',
+    encoding='utf-8',
+    cards=['article.tm-articles-list__item, article.tm-articles-listitem'],
+    fields={
+        'title': [
+            'h2.tm-title a.tm-title__link, h2.tm-title a.tm-titlelink',
+            # Альтернативная разметка карточки
+            'a[data-test-id="article-snippet-title-link"]',
+        ],
+        'time': ['a.tm-article-datetime-published time, time.tm-article-datetime-published'],
+        'image': ['img.tm-article-snippet__lead-image, img.tm-article-snippetlead-image'],
+    },
+    build=_build_it_item,
+    link_base='https://habr.com',
+    # Топ за день: /ru/news/top/daily/page2/ (не сверена с сохранёнными страницами habr)
+    next_page=sources.path_pages('page{page}/'),
+    content=[
+        '#post-content-body .article-formatted-body, .article-formatted-body',
+        'div.article-body, article.tm-article-presenter__content',
+    ],
+))
+
 
 # arr = parse_latest_news_it(URL_IT)
 # print(arr)
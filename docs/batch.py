@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+
+
+"""
+Пакетная загрузка полных текстов статей
+
+fetch_articles() принимает ссылки (строки или словари новостей из news['news']),
+качает их пулом потоков с ограничением общей параллельности и вежливостью к каждому хосту
+(не больше per_host запросов одновременно и не чаще раза в host_interval секунд)
+и отдаёт пары (ссылка, текст) по мере готовности - можно начинать вывод,
+не дожидаясь самой медленной статьи. Повторяющиеся ссылки качаются один раз.
+Если статья не скачалась, текст - пустая строка (как у get_full_article_text*).
+
+С duplicates (dedup.NearDuplicateIndex) карточки, которые оказались почти одинаковыми
+с уже известным сюжетом (та же новость в другом разделе или под другой ссылкой),
+не качаются и не отдаются: их текст совпадает с текстом представителя сюжета.
+Для этого нужны словари новостей (с title), голые ссылки не проверяются.
+
+Настройки по умолчанию: BATCH_WORKERS, BATCH_PER_HOST, BATCH_HOST_INTERVAL
+
+
+- fetch_articles(links, fetch, max_workers=MAX_WORKERS, per_host=PER_HOST, host_interval=HOST_INTERVAL, duplicates=None)
+  -> Iterator[(ссылка, текст)]: fetch - функция ссылка -> текст, например get_full_article_text_it
+"""
+
+
+MAX_WORKERS = int(os.environ.get('BATCH_WORKERS', 8))
+PER_HOST = int(os.environ.get('BATCH_PER_HOST', 2))
+HOST_INTERVAL = float(os.environ.get('BATCH_HOST_INTERVAL', 0.0))
+
+
+class _HostPoliteness:
+
+    def __init__(self, per_host: int, interval: float):
+        self.per_host = per_host
+        self.interval = interval
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._slots[host]
+
+    def call(self, url: str, fetch: Callable[[str], str]) -> str:
+        host = urlsplit(url).netloc
+        with self._slot(host):
+            if self.interval:
+                # Резервируем время старта, чтобы запросы к хосту шли не чаще interval
+                with self._lock:
+                    now = time.monotonic()
+                    start = max(now, self._next_start.get(host, now))
+                    self._next_start[host] = start + self.interval
+                if start > now:
+                    time.sleep(start - now)
+            return fetch(url)
+
+
+def _link_of(item) -> str:
+    if isinstance(item, Mapping):
+        return item.get('link', '')
+    return item
+
+
+def _is_duplicate(item, duplicates) -> bool:
+    if duplicates is None or not isinstance(item, Mapping):
+        return False
+    link = item.get('link', '')
+    return duplicates.add(link, item.get('title', ''), item.get('preview', '')) != link
+
+
+def _safe_fetch(politeness: _HostPoliteness, link: str, fetch: Callable[[str], str]) -> str:
+    try:
+        return politeness.call(link, fetch) or ''
+    except Exception:
+        return ''
+
+
+def fetch_articles(links: Iterable,
+                   fetch: Callable[[str], str],
+                   max_workers: int = MAX_WORKERS,
+                   per_host: int = PER_HOST,
+                   host_interval: float = HOST_INTERVAL,
+                   duplicates=None) -> Iterator[Tuple[str, str]]:
+    politeness = _HostPoliteness(per_host, host_interval)
+    pending = {}
+    seen = set()
+    links_iter = iter(links)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit_next() -> bool:
+            for item in links_iter:
+                link = _link_of(item)
+                if not link or link in seen:
+                    continue
+                seen.add(link)
+                if _is_duplicate(item, duplicates):
+                    continue
+                pending[executor.submit(_safe_fetch, politeness, link, fetch)] = link
+                return True
+            return False
+
+        # В работе держим не больше 2 * max_workers ссылок - входной итератор может быть длинным
+        while len(pending) < max_workers * 2 and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                link = pending.pop(future)
+                yield link, future.result()
+                submit_next()
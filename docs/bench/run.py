@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+DOCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOCS_DIR)
+
+# Замеряем разбор, а не дисковый кэш: каждая итерация скачивает и разбирает страницу заново
+os.environ.setdefault('HTTP_CACHE', '0')
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import http_client  # noqa: E402
+import Parsing_politics_science_health as psh  # noqa: E402
+import Parsing_sport_IT_education as sie  # noqa: E402
+
+
+"""
+Офлайн-бенчмарк парсеров на сохранённых HTML-страницах
+
+Сеть не нужна: запросы общего http_client перехватывает FixtureAdapter и отдаёт
+страницы из bench/fixtures (ленты ria.ru/politics, /science, /health, habr daily top,
+sport.ru, новости k-obr и по одной статье с каждого сайта). Поэтому результаты
+сравнимы между запусками и машинами, а регрессии видны без похода на живые сайты.
+
+Происхождение снимков записано в bench/fixtures/manifest.json: для каждого файла -
+адрес, время записи (--record) или synthetic. Синтетические страницы повторяют только
+разметку карточек и статей, а текст в них - случайные слова; цифры по ним годятся
+для сравнения коммитов между собой, но не говорят о скорости на настоящих сайтах.
+Вид снимков (recorded / synthetic / mixed) попадает в результат, бенчмарк
+предупреждает о синтетических снимках и не сравнивает запуски на снимках разного вида.
+
+Для каждой функции считаются:
+- пропускная способность: страниц/с, карточек/с, МБ/с входного HTML
+- задержка одного вызова: min, p50, p90, p99, mean (мс)
+- пиковая память за вызов (tracemalloc, отдельным прогоном, чтобы не искажать время)
+
+Запуск из папки docs:
+
+    python bench/run.py                        # таблица в консоль
+    python bench/run.py -o bench/results/new.json --compare bench/results/old.json
+    python bench/run.py --filter it -n 200
+    python bench/run.py --record               # перезаписать снимки страниц с живых сайтов
+
+Режимы разбора задаются теми же переменными окружения, что и у приложения
+(PARSE_MODE, PARSE_WORKERS) и попадают в результат.
+
+
+- FIXTURES: URL -> (файл снимка, Content-Type)
+- MANIFEST: файл с происхождением снимков
+- fixtures_kind() -> str: 'recorded', 'synthetic' или 'mixed'
+- CASES: замеряемые функции
+- run_case(case, iterations, warmup) -> Dict: результат замера одной функции
+"""
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MANIFEST = os.path.join(FIXTURES_DIR, 'manifest.json')
+
+ARTICLE_POLITICS = 'https://ria.ru/20251010/story-0.html'
+ARTICLE_IT = 'https://habr.com/ru/news/950000/'
+ARTICLE_SPORT = 'https://www.sport.ru/football/news-0.shtml'
+ARTICLE_EDUCATION = 'https://k-obr.spb.ru/o-komitete/news/0/'
+
+HTML_UTF8 = 'text/html; charset=utf-8'
+HTML_CP1251 = 'text/html; charset=windows-1251'
+
+FIXTURES = {
+    psh.URL_POLITICS: ('ria_politics.html', HTML_UTF8),
+    psh.URL_SCIENCE: ('ria_science.html', HTML_UTF8),
+    psh.URL_HEALTH: ('ria_health.html', HTML_UTF8),
+    sie.URL_IT: ('habr_top_daily.html', HTML_UTF8),
+    sie.URL_SPORT: ('sport.html', HTML_CP1251),
+    sie.URL_EDUCATION: ('kobr_news.html', HTML_UTF8),
+    ARTICLE_POLITICS: ('ria_article.html', HTML_UTF8),
+    ARTICLE_IT: ('habr_article.html', HTML_UTF8),
+    ARTICLE_SPORT: ('sport_article.html', HTML_CP1251),
+    ARTICLE_EDUCATION: ('kobr_article.html', HTML_UTF8),
+}
+
+
+class FixtureAdapter(BaseAdapter):
+
+    def __init__(self, fixtures: Dict[str, tuple]):
+        super().__init__()
+        # Страницы читаются с диска один раз, чтобы не мерить файловую систему
+        self.pages = {}
+        for url, (filename, content_type) in fixtures.items():
+            with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+                # Ключ - адрес в том виде, в каком его отправит requests ('https://www.sport.ru' -> '.../')
+                self.pages[requests.Request('GET', url).prepare().url] = (f.read(), content_type)
+
+    def send(self, request, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        page = self.pages.get(request.url)
+        if page is None:
+            response.status_code = 404
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content = page[0]
+            response.headers = CaseInsensitiveDict({'Content-Type': page[1]})
+        # Тело уже в памяти: http_client читает его кусками через iter_content
+        response._content_consumed = True
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class Case:
+
+    def __init__(self, name: str, func: Callable, url: Optional[str] = None):
+        self.name = name
+        self.func = func
+        self.url = url
+
+    @property
+    def page_bytes(self) -> int:
+        if not self.url:
+            return 0
+        return os.path.getsize(os.path.join(FIXTURES_DIR, FIXTURES[self.url][0]))
+
+
+def _ria_content_div():
+    with open(os.path.join(FIXTURES_DIR, FIXTURES[ARTICLE_POLITICS][0]), 'rb') as f:
+        soup = BeautifulSoup(f.read().decode('utf-8'), 'lxml')
+    return psh.RIA.find_content(soup)
+
+
+_content_div = None
+
+
+def extract_formatted_text():
+    # Только обход готового дерева статьи, без скачивания и разбора HTML
+    global _content_div
+    if _content_div is None:
+        _content_div = _ria_content_div()
+    return psh.parser._extract_formatted_text(_content_div)
+
+
+CASES = [
+    Case('NewsParser.parse_latest_news[politics]',
+         lambda: psh.parser.parse_latest_news(psh.URL_POLITICS, 'politics'), psh.URL_POLITICS),
+    Case('NewsParser.parse_latest_news[science]',
+         lambda: psh.parser.parse_latest_news(psh.URL_SCIENCE, 'science'), psh.URL_SCIENCE),
+    Case('NewsParser.parse_latest_news[health]',
+         lambda: psh.parser.parse_latest_news(psh.URL_HEALTH, 'health'), psh.URL_HEALTH),
+    Case('NewsParser._extract_formatted_text', extract_formatted_text),
+    Case('parse_latest_news_it', lambda: sie.parse_latest_news_it(sie.URL_IT), sie.URL_IT),
+    Case('parse_latest_news_sport', lambda: sie.parse_latest_news_sport(sie.URL_SPORT), sie.URL_SPORT),
+    Case('parse_latest_news_education',
+         lambda: sie.parse_latest_news_education(sie.URL_EDUCATION), sie.URL_EDUCATION),
+    Case('get_full_article_text_politics',
+         lambda: psh.get_full_article_text_politics(ARTICLE_POLITICS), ARTICLE_POLITICS),
+    Case('get_article_preview_politics',
+         lambda: psh.get_article_preview_politics(ARTICLE_POLITICS), ARTICLE_POLITICS),
+    Case('get_full_article_text_it', lambda: sie.get_full_article_text_it(ARTICLE_IT), ARTICLE_IT),
+    Case('get_full_article_text_sport', lambda: sie.get_full_article_text_sport(ARTICLE_SPORT), ARTICLE_SPORT),
+    Case('get_full_article_text_education',
+         lambda: sie.get_full_article_text_education(ARTICLE_EDUCATION), ARTICLE_EDUCATION),
+]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _cards_of(result) -> int:
+    if isinstance(result, dict) and 'news' in result:
+        return len(result['news'])
+    return 0
+
+
+def run_case(case: Case, iterations: int, warmup: int) -> Dict:
+    for _ in range(warmup):
+        case.func()
+
+    latencies = []
+    cards = 0
+    output_size = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        result = case.func()
+        latencies.append(time.perf_counter() - call_started)
+        cards += _cards_of(result)
+        output_size = len(result) if isinstance(result, str) else output_size
+    total = time.perf_counter() - started
+
+    tracemalloc.start()
+    case.func()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'name': case.name,
+        'iterations': iterations,
+        'page_bytes': case.page_bytes,
+        'cards_per_call': cards // iterations,
+        'text_chars': output_size,
+        'pages_per_s': round(iterations / total, 2),
+        'cards_per_s': round(cards / total, 2),
+        'mb_per_s': round(case.page_bytes * iterations / total / 1e6, 2),
+        'latency_ms': {
+            'min': round(latencies[0] * 1000, 3),
+            'p50': round(_percentile(latencies, 0.5) * 1000, 3),
+            'p90': round(_percentile(latencies, 0.9) * 1000, 3),
+            'p99': round(_percentile(latencies, 0.99) * 1000, 3),
+            'mean': round(statistics.fmean(latencies) * 1000, 3),
+        },
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def _load_manifest() -> Dict[str, Dict]:
+    try:
+        with open(MANIFEST, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def fixtures_kind() -> str:
+    # Снимок без записи в манифесте считается синтетическим: его происхождение неизвестно
+    manifest = _load_manifest()
+    recorded = [bool(manifest.get(filename, {}).get('recorded')) for filename, _ in FIXTURES.values()]
+    if all(recorded):
+        return 'recorded'
+    return 'mixed' if any(recorded) else 'synthetic'
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DOCS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _environment() -> Dict:
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parse_mode': os.environ.get('PARSE_MODE', 'partial'),
+        'parse_workers': os.environ.get('PARSE_WORKERS', '0'),
+        'fixtures': fixtures_kind(),
+    }
+
+
+def print_table(results: List[Dict], baseline: Optional[Dict[str, Dict]] = None) -> None:
+    header = f'{"function":<42} {"pages/s":>9} {"cards/s":>10} {"p50 ms":>9} {"p99 ms":>9} {"peak KB":>9}'
+    if baseline is not None:
+        header += f' {"p50 vs base":>12}'
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        latency = result['latency_ms']
+        line = (f'{result["name"]:<42} {result["pages_per_s"]:>9.1f} {result["cards_per_s"]:>10.1f} '
+                f'{latency["p50"]:>9.3f} {latency["p99"]:>9.3f} {result["peak_memory_kb"]:>9.1f}')
+        if baseline is not None:
+            previous = baseline.get(result['name'])
+            if previous and previous['latency_ms']['p50']:
+                change = latency['p50'] / previous['latency_ms']['p50'] - 1
+                line += f' {change:>+11.1%}'
+            else:
+                line += f' {"-":>12}'
+        print(line)
+
+
+# Статья для снимка - первая карточка соответствующей ленты
+ARTICLE_LISTINGS = {
+    ARTICLE_POLITICS: lambda: psh.parse_latest_news_politics(),
+    ARTICLE_IT: lambda: sie.parse_latest_news_it(sie.URL_IT),
+    ARTICLE_SPORT: lambda: sie.parse_latest_news_sport(sie.URL_SPORT),
+    ARTICLE_EDUCATION: lambda: sie.parse_latest_news_education(sie.URL_EDUCATION),
+}
+
+
+def _save_snapshot(url: str, filename: str, manifest: Dict[str, Dict]) -> None:
+    response = http_client.get(url)
+    response.raise_for_status()
+    with open(os.path.join(FIXTURES_DIR, filename), 'wb') as f:
+        f.write(response.content)
+    manifest[filename] = {'url': url, 'recorded': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+    print(f'{url} -> {filename} ({len(response.content)} bytes)')
+
+
+def record() -> None:
+    manifest = _load_manifest()
+    try:
+        for url, (filename, _) in FIXTURES.items():
+            if url not in ARTICLE_LISTINGS:
+                _save_snapshot(url, filename, manifest)
+
+        for url, listing in ARTICLE_LISTINGS.items():
+            news = listing()['news']
+            if news:
+                # Снимок хранится под постоянным адресом из FIXTURES, откуда бы ни была статья
+                _save_snapshot(news[0]['link'], FIXTURES[url][0], manifest)
+    finally:
+        # Уже записанные снимки отмечаются, даже если какой-то сайт не ответил
+        with open(MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description='Офлайн-бенчмарк парсеров новостей')
+    arg_parser.add_argument('-n', '--iterations', type=int, default=50)
+    arg_parser.add_argument('--warmup', type=int, default=3)
+    arg_parser.add_argument('--filter', default='', help='только функции, в имени которых есть подстрока')
+    arg_parser.add_argument('-o', '--output', help='записать результаты в JSON')
+    arg_parser.add_argument('--compare', help='JSON прошлого запуска для сравнения')
+    arg_parser.add_argument('--record', action='store_true', help='перезаписать снимки страниц с живых сайтов')
+    args = arg_parser.parse_args(argv)
+
+    if args.record:
+        record()
+        return 0
+
+    adapter = FixtureAdapter(FIXTURES)
+    http_client.client.session.mount('http://', adapter)
+    http_client.client.session.mount('https://', adapter)
+
+    kind = fixtures_kind()
+    if kind != 'recorded':
+        print(f'warning: {kind} fixtures - run with --record to benchmark real pages', file=sys.stderr)
+
+    results = [run_case(case, args.iterations, args.warmup)
+               for case in CASES if args.filter in case.name]
+
+    for result in results:
+        if not result['cards_per_call'] and not result['text_chars']:
+            # Пустой результат - снимок устарел или селекторы больше не совпадают
+            print(f'warning: {result["name"]} returned nothing', file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        previous_kind = previous.get('environment', {}).get('fixtures', 'synthetic')
+        if previous_kind != kind:
+            print(f'error: {args.compare} was measured on {previous_kind} fixtures, this run on {kind}',
+                  file=sys.stderr)
+            return 2
+        baseline = {result['name']: result for result in previous['results']}
+    print_table(results, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                       'environment': _environment(),
+                       'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from typing import Dict
+
+import requests
+
+
+"""
+Предохранители (circuit breakers) для источников
+
+Если сайт подряд FAILURES раз не ответил (ошибка соединения, таймаут самого запроса,
+ответ 5xx или 429), предохранитель его хоста размыкается: следующие COOLDOWN
+секунд запросы к хосту сразу завершаются CircuitOpenError, не занимая поток
+ожиданием заведомо больного сайта. После паузы пропускается один пробный запрос
+(полуоткрытое состояние): удачный замыкает предохранитель, неудачный снова размыкает.
+Запрос, прерванный не сайтом, а вызывающим кодом (истёк его более короткий общий срок),
+не считается ни удачей, ни неудачей (record_cancelled).
+
+Вызывающий код в это время отдаёт последний удачный результат
+(устаревшую копию страницы из дискового кэша, ленту из FeedCache).
+
+Настройки: CIRCUIT_FAILURES, CIRCUIT_COOLDOWN
+
+
+!!!! КЛАССЫ
+
+class CircuitOpenError(requests.ConnectionError):   ///   Запрос не отправлен: предохранитель хоста разомкнут
+
+class CircuitBreaker:   ///   Предохранитель одного хоста
+
+class CircuitBreakers:   ///   Предохранители по хостам
+
+
+!!!!  МЕТОД   ///   что делает
+
+CircuitBreaker.allow(self) -> bool:   ///   Можно ли отправить запрос (в полуоткрытом состоянии - только один пробный)
+
+CircuitBreaker.record_success(self) -> None:   ///   Запрос удался: предохранитель замыкается
+
+CircuitBreaker.record_failure(self) -> None:   ///   Запрос не удался: после FAILURES неудач подряд предохранитель размыкается
+
+CircuitBreaker.record_cancelled(self) -> None:   ///   Запрос прерван вызывающим: счётчик не меняется, пробный запрос освобождается
+
+CircuitBreaker.state(self) -> str:   ///   'closed', 'open' или 'half_open'
+
+CircuitBreakers.get(self, host: str) -> CircuitBreaker:   ///   Предохранитель хоста (создаётся при первом обращении)
+
+CircuitBreakers.snapshot(self) -> Dict[str, str]:   ///   Состояния всех предохранителей {хост: состояние}
+"""
+
+
+FAILURES = int(os.environ.get('CIRCUIT_FAILURES', 5))
+COOLDOWN = float(os.environ.get('CIRCUIT_COOLDOWN', 60))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, failures: int = FAILURES, cooldown: float = COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._failed = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failed = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failed += 1
+            # Неудачный пробный запрос - снова пауза, не дожидаясь FAILURES ошибок
+            if self._probing or self._failed >= self.failures:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_cancelled(self) -> None:
+        # О здоровье сайта ничего не известно - следующий запрос снова может быть пробным
+        with self._lock:
+            self._probing = False
+
+
+class CircuitBreakers:
+
+    def __init__(self, failures: int = FAILURES, cooldown: float = COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failures, self.cooldown)
+            return breaker
+
+    def snapshot(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.state() for host, breaker in breakers.items()}
@@ -0,0 +1,196 @@
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import batch
+import preview
+import sections
+from dedup import stories
+from store import ArticleStore, store as default_store
+
+
+"""
+Инкрементальный обход разделов с сохранением статей в ArticleStore
+
+Страницы ленты раздела скачиваются через дисковый кэш (обычно это 304),
+новые карточки добавляются в базу, а полный текст (и превью из него) качается
+только для ссылок, у которых его ещё нет. Повторный обход стоит O(новых карточек), а не
+O(все карточки x загрузка статьи).
+
+Лента читается вглубь: за первой страницей раздела идут следующие (sections.page_url),
+пока не встретится уже известное - страница, все ссылки которой есть в базе
+или в уже прочитанных страницах, или последняя (самая старая) карточка которой уже в базе.
+Обычное обновление поэтому стоит одну страницу, а первый запуск с пустой базой
+догружает архив до MAX_PAGES страниц (DEEP_CRAWL_PAGES) - у источников, чья схема
+страниц подтверждена (sources.Source.page_url, PAGINATION_SOURCES); остальные
+разделы читаются по одной первой странице.
+
+Карточки всех разделов попадают в индекс почти одинаковых новостей (dedup.stories):
+текст сюжета, который уже встретился в другом разделе или под другой ссылкой,
+повторно не качается.
+
+Запуск из консоли: python crawler.py [--pages N] [раздел ...]
+
+
+- crawl_section(name, store=store, fetch_texts=True, max_pages=MAX_PAGES) -> Dict[str, int]: обходит один раздел,
+  возвращает {'cards': карточек в ленте, 'pages': прочитано страниц, 'new': новых карточек, 'duplicates': почти одинаковых с уже известными,
+  'texts': скачано текстов, 'copied': дублей, получивших текст своего сюжета}
+
+- ingest(name, result, store=store, fetch_texts=True, max_pages=MAX_PAGES) -> Dict[str, int]: то же,
+  начиная с уже скачанной первой страницы result (подходит как подписчик FeedCache.add_listener)
+
+- crawl_all(names=None, store=store, fetch_texts=True, max_pages=MAX_PAGES) -> Dict[str, Dict[str, int]]: обходит все разделы
+
+
+!!!! КЛАСС
+
+class BackgroundIngest:   ///   ingest в отдельном фоновом потоке (подписчик FeedCache, не задерживающий обновление ленты)
+
+
+!!!!  МЕТОД   ///   что делает
+
+BackgroundIngest.submit(self, name: str, result: Dict[str, List]) -> None:   ///   Ставит раздел в очередь и сразу возвращается.
+    Пока раздел ждёт очереди, новая лента заменяет старую: обрабатывается только последняя
+"""
+
+
+MAX_PAGES = int(os.environ.get('DEEP_CRAWL_PAGES', 10))
+
+
+def crawl_section(name: str, store: ArticleStore = default_store, fetch_texts: bool = True,
+                  max_pages: int = MAX_PAGES) -> Dict[str, int]:
+    return ingest(name, sections.parse_section(name), store, fetch_texts, max_pages)
+
+
+def _is_absolute(link: str) -> bool:
+    return urlsplit(link).scheme in ('http', 'https')
+
+
+def _reached_known(page_news: List, known: Set[str]) -> bool:
+    # Дальше по ленте - только старые новости, которые уже читали
+    links = [item['link'] for item in page_news]
+    return all(link in known for link in links) or links[-1] in known
+
+
+def _read_pages(name: str, news: List, store: ArticleStore, max_pages: int) -> Tuple[List, int]:
+    cards = []
+    seen: Set[str] = set()
+    pages = 0
+    while news:
+        # Относительную ссылку не скачать (и не отличить хост для предохранителя) - такие карточки пропускаются
+        news = [item for item in news if _is_absolute(item.get('link', ''))]
+        if not news:
+            break
+        pages += 1
+        known = store.known_links(item['link'] for item in news) | seen
+        cards.extend(item for item in news if item['link'] not in seen)
+        seen.update(item['link'] for item in news)
+        if pages >= max_pages or _reached_known(news, known):
+            break
+
+        url = sections.page_url(name, pages + 1, news)
+        if not url:
+            break
+        try:
+            news = sections.parse_section(name, url)['news']
+        except Exception:
+            break
+    return cards, pages
+
+
+def ingest(name: str, result: Dict[str, List], store: ArticleStore = default_store,
+           fetch_texts: bool = True, max_pages: int = MAX_PAGES) -> Dict[str, int]:
+    news, pages = _read_pages(name, result['news'], store, max_pages)
+    # Все страницы сохраняются одним вызовом: порядок added_at - порядок ленты
+    new_cards = store.add_cards(name, news)
+    # Сюжеты сравниваются по заголовку вместе с превью текста, если текст уже скачан
+    previews = store.previews(item['link'] for item in news)
+    duplicates = stories.add_news((dict(item, preview=previews.get(item['link'], '')) for item in news), name)
+    result = {'cards': len(news), 'pages': pages, 'new': new_cards, 'duplicates': len(duplicates),
+              'texts': 0, 'copied': 0}
+
+    if not fetch_texts:
+        return result
+
+    missing = set(store.links_without_text(item['link'] for item in news))
+    missing_news = [item for item in news if item['link'] in missing]
+    titles = {item['link']: item.get('title', '') for item in missing_news}
+    fetched = set()
+    for link, text in batch.fetch_articles(missing_news, sections.ARTICLE_TEXT[name], duplicates=stories):
+        fetched.add(link)
+        # Превью считается один раз здесь, а не при каждом показе ленты
+        text_preview = preview.preview_from_text(text)
+        store.save_text(link, text, text_preview)
+        if text:
+            result['texts'] += 1
+            # Следующие карточки сравниваются с этой новостью уже по её тексту
+            stories.add(link, titles.get(link, ''), text_preview, name)
+
+    # Дубли не скачивались: им достаётся текст представителя сюжета (он уже скачан выше
+    # или раньше), иначе links_without_text возвращал бы их при каждом обходе
+    for link in missing - fetched:
+        canonical = stories.canonical(link)
+        if canonical != link and store.copy_text(link, canonical):
+            result['copied'] += 1
+
+    return result
+
+
+class BackgroundIngest:
+
+    def __init__(self, after: Optional[Callable[[str], None]] = None, store: ArticleStore = default_store):
+        self.after = after
+        self.store = store
+        # раздел -> последняя ещё не обработанная лента, в порядке поступления
+        self._pending: Dict[str, Dict[str, List]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, name: str, result: Dict[str, List]) -> None:
+        with self._lock:
+            self._pending[name] = result
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='crawler-ingest', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        # Один поток на все разделы: статьи качаются и пишутся в базу по очереди
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                name = next(iter(self._pending))
+                result = self._pending.pop(name)
+            try:
+                ingest(name, result, self.store)
+                if self.after is not None:
+                    self.after(name)
+            except Exception:
+                # Сбой одного раздела не останавливает очередь; карточки догрузятся при следующем обновлении
+                pass
+
+
+def crawl_all(names: Optional[Iterable[str]] = None,
+              store: ArticleStore = default_store,
+              fetch_texts: bool = True,
+              max_pages: int = MAX_PAGES) -> Dict[str, Dict[str, int]]:
+    names = list(names) if names is not None else list(sections.SECTIONS)
+    result = {}
+    for name in names:
+        try:
+            result[name] = crawl_section(name, store, fetch_texts, max_pages)
+        except Exception as e:
+            result[name] = {'error': f'{type(e).__name__}: {e}'}
+    return result
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    max_pages = MAX_PAGES
+    if args[:1] == ['--pages']:
+        max_pages, args = int(args[1]), args[2:]
+    for name, stats in crawl_all(args or None, max_pages=max_pages).items():
+        print(name, stats)
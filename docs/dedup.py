@@ -0,0 +1,239 @@
+import os
+import random
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import timestamps
+from search import tokenize
+
+
+"""
+Поиск почти одинаковых новостей во всех разделах и источниках (MinHash + LSH)
+
+Один и тот же сюжет RIA показывает и в политике, и в здоровье, иногда под немного
+другой ссылкой и с чуть изменённым заголовком. Точное сравнение ссылок (seen_links
+в Source.extract_news) такие повторы не ловит.
+
+Заголовок вместе с превью текста разбивается на шинглы: слова после нормализации
+(search.tokenize) и пары соседних слов. Сигнатура MinHash из NUM_PERM чисел
+оценивает сходство Жаккара двух наборов шинглов. Сигнатура режется на BANDS полос,
+новости с совпавшей полосой попадают в одну корзину LSH - кандидатов ищем только
+в этих корзинах, а не сравнением со всеми новостями (сублинейно по числу новостей).
+Кандидат считается дублем, если оценка сходства не ниже THRESHOLD и новости
+близки по времени: обе опубликованы в пределах WINDOW часов, а если время
+публикации неизвестно - из одного раздела. Одних заголовков мало: "Путин провел
+телефонный разговор с Эрдоганом" и "...с Алиевым" - разные новости, поэтому порог высокий,
+а когда у новости появляется текст, её сигнатура пересчитывается по заголовку с превью.
+
+Дубль получает ссылку-представителя (canonical) - первую новость своего сюжета.
+Индекс хранит последние MAX_ITEMS новостей, старые вытесняются.
+
+Настройки: DEDUP_THRESHOLD, DEDUP_WINDOW_HOURS, DEDUP_MAX_ITEMS
+
+
+!!!! КЛАСС
+
+class NearDuplicateIndex:   ///   LSH-индекс сигнатур MinHash заголовков новостей
+
+
+!!!!  МЕТОД   ///   что делает
+
+add(self, link: str, title: str, preview: str = '', section: str = '', published: str = '') -> str:   ///   Добавляет новость,
+    возвращает ссылку-представителя её сюжета (саму link, если дублей нет). Для уже известной новости
+    с появившимся превью пересчитывает сигнатуру (представитель не меняется)
+
+add_news(self, news: Iterable[Mapping], section: str = '') -> Dict[str, str]:   ///   add() для карточек ленты, возвращает {ссылка дубля: ссылка-представитель}
+
+canonical(self, link: str) -> str:   ///   Ссылка-представитель сюжета (link, если новость неизвестна или уникальна)
+
+is_duplicate(self, link: str) -> bool:   ///   Есть ли у новости более ранний почти одинаковый сюжет
+
+cluster(self, link: str) -> List[str]:   ///   Все известные ссылки сюжета
+
+similarity(self, first: str, second: str) -> float:   ///   Оценка сходства двух известных новостей
+
+remove(self, link: str) -> None:   ///   Убирает новость из индекса
+
+
+- shingles(text) -> set: шинглы текста
+- stories: общий экземпляр NearDuplicateIndex (заполняется в crawler.ingest)
+"""
+
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', 0.8))
+# Сюжет - новости не дальше WINDOW часов друг от друга
+WINDOW = float(os.environ.get('DEDUP_WINDOW_HOURS', 24)) * 3600
+MAX_ITEMS = int(os.environ.get('DEDUP_MAX_ITEMS', 20000))
+
+# Короткие заголовки ("Главное за день") слишком похожи друг на друга - их не склеиваем
+MIN_SHINGLES = 4
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Фиксированное зерно: одинаковые сигнатуры во всех процессах и после перезапуска
+_rng = random.Random(20251010)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text: str) -> set:
+    words = tokenize(text)
+    result = set(words)
+    result.update(f'{first} {second}' for first, second in zip(words, words[1:]))
+    return result
+
+
+def _signature(items: set) -> Tuple[int, ...]:
+    hashes = [zlib.crc32(item.encode('utf-8')) for item in items]
+    return tuple(min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def _bands(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def _similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERM
+
+
+class NearDuplicateIndex:
+
+    def __init__(self, threshold: float = THRESHOLD, max_items: int = MAX_ITEMS):
+        self.threshold = threshold
+        self.max_items = max_items
+        # ссылка -> сигнатура, в порядке добавления (для вытеснения старых)
+        self._signatures: 'OrderedDict[str, Tuple[int, ...]]' = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self._canonical: Dict[str, str] = {}
+        self._members: Dict[str, List[str]] = {}
+        # ссылка -> (раздел, время публикации в секундах или None, сигнатура с превью)
+        self._meta: Dict[str, Tuple[str, Optional[float], bool]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, link: str) -> bool:
+        return link in self._canonical
+
+    def _close(self, section: str, published: Optional[float], candidate: str) -> bool:
+        other_section, other_published, _ = self._meta[candidate]
+        if published is not None and other_published is not None:
+            return abs(published - other_published) <= WINDOW
+        return section == other_section
+
+    def _best_match(self, signature: Tuple[int, ...], section: str, published: Optional[float]) -> Optional[str]:
+        candidates = set()
+        for band in _bands(signature):
+            candidates.update(self._buckets.get(band, ()))
+
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            if not self._close(section, published, candidate):
+                continue
+            score = _similarity(signature, self._signatures[candidate])
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def add(self, link: str, title: str, preview: str = '', section: str = '', published: str = '') -> str:
+        with self._lock:
+            if link in self._canonical:
+                if preview and not self._meta[link][2]:
+                    self._reindex(link, title, preview)
+                return self._canonical[link]
+
+            items = shingles(f'{title} {preview}')
+            # Короткие заголовки в индекс не попадают вовсе: представитель - сама ссылка
+            if len(items) < MIN_SHINGLES:
+                return link
+
+            parsed = timestamps.from_iso(published)
+            when = parsed.timestamp() if parsed is not None else None
+            signature = _signature(items)
+            match = self._best_match(signature, section, when)
+            canonical = self._canonical[match] if match is not None else link
+
+            self._meta[link] = (section, when, bool(preview))
+            self._index(link, signature)
+            self._canonical[link] = canonical
+            self._members.setdefault(canonical, []).append(link)
+
+            while len(self._signatures) > self.max_items:
+                self._remove(next(iter(self._signatures)))
+            return canonical
+
+    def _index(self, link: str, signature: Tuple[int, ...]) -> None:
+        # Присваивание уже известной ссылке не меняет её место в очереди вытеснения
+        self._signatures[link] = signature
+        for band in _bands(signature):
+            self._buckets.setdefault(band, []).append(link)
+
+    def _unbucket(self, link: str, signature: Tuple[int, ...]) -> None:
+        for band in _bands(signature):
+            bucket = self._buckets[band]
+            bucket.remove(link)
+            if not bucket:
+                del self._buckets[band]
+
+    def _reindex(self, link: str, title: str, preview: str) -> None:
+        # Текст появился позже карточки: дальнейшие сравнения - по заголовку с превью,
+        # представитель сюжета остаётся прежним
+        self._unbucket(link, self._signatures[link])
+        self._index(link, _signature(shingles(f'{title} {preview}')))
+        section, when, _ = self._meta[link]
+        self._meta[link] = (section, when, True)
+
+    def add_news(self, news: Iterable[Mapping], section: str = '') -> Dict[str, str]:
+        duplicates = {}
+        for item in news:
+            link = item.get('link', '')
+            if not link:
+                continue
+            canonical = self.add(link, item.get('title', ''), item.get('preview', ''),
+                                 item.get('section', '') or section, item.get('published', ''))
+            if canonical != link:
+                duplicates[link] = canonical
+        return duplicates
+
+    def canonical(self, link: str) -> str:
+        return self._canonical.get(link, link)
+
+    def is_duplicate(self, link: str) -> bool:
+        return self.canonical(link) != link
+
+    def cluster(self, link: str) -> List[str]:
+        with self._lock:
+            return list(self._members.get(self._canonical.get(link, link), [link]))
+
+    def similarity(self, first: str, second: str) -> float:
+        with self._lock:
+            if first not in self._signatures or second not in self._signatures:
+                return 0.0
+            return _similarity(self._signatures[first], self._signatures[second])
+
+    def remove(self, link: str) -> None:
+        with self._lock:
+            self._remove(link)
+
+    def _remove(self, link: str) -> None:
+        canonical = self._canonical.pop(link, None)
+        self._meta.pop(link, None)
+        signature = self._signatures.pop(link, None)
+        if signature is not None:
+            self._unbucket(link, signature)
+        if canonical is not None and canonical in self._members:
+            members = self._members[canonical]
+            if link in members:
+                members.remove(link)
+            if not members:
+                del self._members[canonical]
+        # Дубли вытесненной новости продолжают ссылаться на неё: ссылка - только имя сюжета
+
+
+stories = NearDuplicateIndex()
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import sections
+from shared_cache import shared_feeds
+
+
+"""
+Кэш лент разделов в памяти с фоновым обновлением (stale-while-revalidate)
+
+Маршруты Flask читают ленты только из памяти и никогда не ждут сети:
+фоновый поток раз в REFRESH_INTERVAL секунд перекачивает все разделы,
+а если запись устарела (поток не успел или упал) - get() отдаёт старые данные
+и ставит раздел на обновление в отдельном потоке.
+
+Если парсер вернул пустую ленту или упал, в кэше остаётся последний удачный результат.
+
+С общим кэшем (shared_cache.SharedFeeds) воркеры одного узла не качают раздел каждый сам:
+обновление идёт под межпроцессной блокировкой раздела, и лента, которую только что
+скачал другой процесс (моложе интервала), берётся из общего кэша вместе с её возрастом.
+
+
+!!!! КЛАСС
+
+class FeedCache:   ///   Кэш лент разделов с фоновым обновлением
+
+
+!!!!  МЕТОД   ///   что делает
+
+get(self, name: str) -> Dict[str, List]:   ///   Возвращает ленту раздела из памяти ({'news': []}, если ещё не загружена)
+
+age(self, name: str) -> Optional[float]:   ///   Возраст записи в секундах или None
+
+version(self, name: str) -> int:   ///   Номер версии ленты: растёт, только когда меняется список новостей (0 - ещё не загружена)
+
+snapshot(self, name: str) -> Tuple[int, Dict[str, List]]:   ///   (версия, лента), прочитанные вместе: лента именно этой версии
+    (get() и version() по отдельности могут попасть по разные стороны обновления)
+
+refresh(self, name: str) -> bool:   ///   Синхронно обновляет один раздел, True если данные обновились
+
+refresh_all(self) -> None:   ///   Синхронно и параллельно обновляет все разделы
+
+warm(self, name: str, result: Dict[str, List]) -> None:   ///   Подкладывает начальные данные, не считая их свежими
+
+update(self, name: str, result: Dict[str, List], age: float = 0.0) -> None:   ///   Кладёт в кэш готовый результат парсинга возраста age секунд (пустые ленты игнорируются)
+
+touch(self, name: str) -> None:   ///   Новая версия ленты без смены новостей: изменились данные для показа (превью в базе статей)
+
+add_listener(self, listener) -> None:   ///   Подписка listener(name, result) на каждое удачное обновление раздела
+
+start(self) -> None:   ///   Запускает фоновый поток обновления
+
+stop(self) -> None:   ///   Останавливает фоновый поток
+
+
+- feeds: общий экземпляр FeedCache для всех разделов из sections.SECTIONS (с общим кэшем shared_cache.shared_feeds)
+"""
+
+
+REFRESH_INTERVAL = float(os.environ.get('FEED_REFRESH_INTERVAL', 300))
+# Пауза между повторными попытками обновить раздел после неудачи
+RETRY_DELAY = float(os.environ.get('FEED_RETRY_DELAY', 30))
+
+
+class FeedCache:
+
+    def __init__(self, loaders: Dict[str, Callable[[], Dict[str, List]]],
+                 interval: float = REFRESH_INTERVAL,
+                 shared=None):
+        self.loaders = loaders
+        self.interval = interval
+        self.shared = shared
+        self._entries: Dict[str, Dict[str, List]] = {}
+        self._updated: Dict[str, float] = {}
+        self._versions: Dict[str, int] = {}
+        self._attempted: Dict[str, float] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[str, Dict[str, List]], None]] = []
+
+    def get(self, name: str) -> Dict[str, List]:
+        entry = self._entries.get(name)
+        age = self.age(name)
+
+        # Устаревшую (или отсутствующую) запись отдаём как есть и обновляем в фоне
+        if age is None or age > self.interval:
+            self._revalidate(name)
+
+        return entry if entry is not None else {'news': []}
+
+    def age(self, name: str) -> Optional[float]:
+        updated = self._updated.get(name)
+        if updated is None:
+            return None
+        return time.monotonic() - updated
+
+    def version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def snapshot(self, name: str) -> Tuple[int, Dict[str, List]]:
+        with self._lock:
+            version = self._versions.get(name, 0)
+            entry = self._entries.get(name)
+        # Проверка возраста и фоновое обновление - как в get()
+        self.get(name)
+        return version, entry if entry is not None else {'news': []}
+
+    def refresh(self, name: str) -> bool:
+        # Один раздел одновременно обновляет только один поток
+        with self._lock:
+            if name in self._refreshing:
+                return False
+            self._refreshing.add(name)
+            self._attempted[name] = time.monotonic()
+
+        try:
+            result, age = self._load(name)
+        except Exception:
+            result, age = None, 0.0
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+        # Пустая лента обычно означает сбой источника - оставляем старые данные
+        if not result or not result.get('news'):
+            return False
+
+        self.update(name, result, age)
+        return True
+
+    def _load(self, name: str):
+        if self.shared is None:
+            return self.loaders[name](), 0.0
+
+        # Раздел качает один процесс узла, остальные ждут и берут его результат
+        with self.shared.lock(name):
+            cached = self.shared.get(name, self.interval)
+            if cached is not None:
+                return cached
+            result = self.loaders[name]()
+            if result and result.get('news'):
+                self.shared.put(name, result)
+            return result, 0.0
+
+    def refresh_all(self) -> None:
+        # Разделы обновляются параллельно: время цикла - самый медленный источник, а не сумма
+        with ThreadPoolExecutor(max_workers=max(len(self.loaders), 1)) as executor:
+            list(executor.map(self.refresh, self.loaders))
+
+    def warm(self, name: str, result: Dict[str, List]) -> None:
+        # Начальные данные (например, из ArticleStore после перезапуска): отдаются сразу,
+        # но считаются устаревшими, так что первый же get() запустит обновление
+        if not result or not result.get('news'):
+            return
+
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = result
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def update(self, name: str, result: Dict[str, List], age: float = 0.0) -> None:
+        if not result or not result.get('news'):
+            return
+
+        with self._lock:
+            previous = self._entries.get(name)
+            if previous is None or previous['news'] != result['news']:
+                self._versions[name] = self._versions.get(name, 0) + 1
+            self._entries[name] = result
+            self._updated[name] = time.monotonic() - age
+            listeners = list(self._listeners)
+
+        # Подписчики вызываются в потоке обновления, их ошибки кэш не ломают
+        for listener in listeners:
+            try:
+                listener(name, result)
+            except Exception:
+                pass
+
+    def touch(self, name: str) -> None:
+        with self._lock:
+            if name in self._entries:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def add_listener(self, listener: Callable[[str, Dict[str, List]], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='feed-cache', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.refresh_all()
+            self._stop_event.wait(self.interval)
+
+    def _revalidate(self, name: str) -> None:
+        if name not in self.loaders or name in self._refreshing:
+            return
+
+        attempted = self._attempted.get(name)
+        if attempted is not None and time.monotonic() - attempted < RETRY_DELAY:
+            return
+
+        threading.Thread(target=self.refresh, args=(name,),
+                         name=f'feed-cache-{name}', daemon=True).start()
+
+
+feeds = FeedCache({
+    name: (lambda name=name: sections.parse_section(name))
+    for name in sections.SECTIONS
+}, shared=shared_feeds)
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+from email.utils import format_datetime
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+from xml.etree import ElementTree
+
+import news_item
+import timestamps
+
+
+"""
+Машиночитаемые ленты разделов: JSON, RSS 2.0 и Atom
+
+Сериализуется та же структура {'news': [...]}, что отдают парсеры и FeedCache.
+Сами функции ничего не кэшируют: в main.py результат строится один раз на версию
+ленты (FeedCache.version()) и хранится в response_cache.ResponseCache вместе со
+сжатыми копиями и ETag - запрос ленты обходится выбором готовых байтов или 304.
+
+JSON - ровно {'news': [...]} (как /api/sections для одного раздела).
+RSS/Atom: заголовок и ссылка карточки, время публикации из поля published
+(карточки без него в RSS идут без pubDate, в Atom - со временем самой ленты).
+Время ленты - самое свежее published её карточек.
+
+
+!!!! ФУНКЦИИ   ///   что делает
+
+to_json(name: str, news: List, site: str) -> str:   ///   {'news': [...]} в JSON
+
+to_rss(name: str, news: List, site: str) -> str:   ///   Лента RSS 2.0
+
+to_atom(name: str, news: List, site: str) -> str:   ///   Лента Atom
+
+
+- TITLES: имя раздела -> заголовок ленты
+- FORMATS: расширение ('json', 'rss', 'atom') -> (Content-Type, функция сериализации)
+  (site - корень сайта вида 'https://example.org/': из него строятся ссылки на саму ленту и раздел)
+"""
+
+
+TITLES = {
+    'politics': 'Политика',
+    'science': 'Наука',
+    'health': 'Здоровье',
+    'sport': 'Спорт',
+    'it': 'IT',
+    'education': 'Образование',
+}
+
+# Страницы разделов на сайте (маршруты main.py)
+SECTION_PATHS = {
+    'politics': 'pol',
+    'science': 'science',
+    'health': 'healph',
+    'sport': 'sp',
+    'it': 'it',
+    'education': 'educ',
+}
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+
+def _published(item: Mapping) -> Optional[datetime]:
+    return timestamps.from_iso(item.get('published', ''))
+
+
+def _feed_updated(news: List) -> datetime:
+    dates = [published for published in map(_published, news) if published is not None]
+    return max(dates) if dates else datetime.now(timestamps.MOSCOW)
+
+
+def _xml(root: ElementTree.Element) -> str:
+    return '<?xml version="1.0" encoding="utf-8"?>\n' + ElementTree.tostring(root, encoding='unicode')
+
+
+def _sub(parent: ElementTree.Element, tag: str, text: str = '', **attrs) -> ElementTree.Element:
+    element = ElementTree.SubElement(parent, tag, attrs)
+    if text:
+        element.text = text
+    return element
+
+
+def to_json(name: str, news: List, site: str) -> str:
+    return json.dumps({'news': news}, ensure_ascii=False, default=news_item.to_json)
+
+
+def to_rss(name: str, news: List, site: str) -> str:
+    rss = ElementTree.Element('rss', {'version': '2.0', 'xmlns:atom': ATOM_NS})
+    channel = _sub(rss, 'channel')
+    _sub(channel, 'title', TITLES.get(name, name))
+    _sub(channel, 'link', site + SECTION_PATHS.get(name, ''))
+    _sub(channel, 'description', f'{TITLES.get(name, name)}: последние новости')
+    _sub(channel, 'language', 'ru')
+    _sub(channel, 'lastBuildDate', format_datetime(_feed_updated(news)))
+    _sub(channel, 'atom:link', href=f'{site}feed/{name}.rss', rel='self', type='application/rss+xml')
+
+    for item in news:
+        entry = _sub(channel, 'item')
+        _sub(entry, 'title', item.get('title', ''))
+        _sub(entry, 'link', item.get('link', ''))
+        _sub(entry, 'guid', item.get('link', ''), isPermaLink='true')
+        published = _published(item)
+        if published is not None:
+            _sub(entry, 'pubDate', format_datetime(published))
+    return _xml(rss)
+
+
+def to_atom(name: str, news: List, site: str) -> str:
+    updated = _feed_updated(news)
+    feed = ElementTree.Element('feed', {'xmlns': ATOM_NS, 'xml:lang': 'ru'})
+    _sub(feed, 'id', f'{site}feed/{name}.atom')
+    _sub(feed, 'title', TITLES.get(name, name))
+    _sub(feed, 'updated', timestamps.to_iso(updated))
+    _sub(feed, 'link', href=f'{site}feed/{name}.atom', rel='self', type='application/atom+xml')
+    _sub(feed, 'link', href=site + SECTION_PATHS.get(name, ''), rel='alternate', type='text/html')
+    author = _sub(feed, 'author')
+    _sub(author, 'name', site)
+
+    for item in news:
+        entry = _sub(feed, 'entry')
+        _sub(entry, 'id', item.get('link', ''))
+        _sub(entry, 'title', item.get('title', ''))
+        _sub(entry, 'link', href=item.get('link', ''))
+        _sub(entry, 'updated', timestamps.to_iso(_published(item) or updated))
+    return _xml(feed)
+
+
+FORMATS: Dict[str, Tuple[str, Callable[[str, List, str], str]]] = {
+    'json': ('application/json; charset=utf-8', to_json),
+    'rss': ('application/rss+xml; charset=utf-8', to_rss),
+    'atom': ('application/atom+xml; charset=utf-8', to_atom),
+}
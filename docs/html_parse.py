@@ -0,0 +1,110 @@
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+try:
+    from bs4.filter import ElementFilter
+except ImportError:  # beautifulsoup4 < 4.13 - частичный разбор недоступен
+    ElementFilter = None
+
+
+"""
+Разбор HTML страниц-лент: полный или только карточки новостей
+
+В режиме 'partial' BeautifulSoup строит дерево только для элементов, подходящих под
+селекторы карточек источника (и их потомков), а шапка, подвал, скрипты и реклама
+в дерево не попадают. Это быстрее и требует меньше памяти. Режим 'full' строит всё дерево,
+как раньше, - например, чтобы сравнить результаты.
+
+Режим задаётся переменной окружения PARSE_MODE или присваиванием html_parse.PARSE_MODE.
+
+Селекторы карточек - простые CSS-селекторы без вложенности: 'tag', '.class',
+'tag.class1.class2', '[attr="value"]', 'tag.class[attr]'.
+
+
+!!!! КЛАСС
+
+class CardStrainer(ElementFilter):   ///   Фильтр для parse_only, пропускающий только карточки
+
+
+- make_soup(markup, cards=None, mode=None) -> BeautifulSoup: разбирает страницу; если задан
+  CardStrainer cards и режим 'partial' - только карточки, иначе целиком.
+  markup лучше передавать байтами вместе с encoding: их декодирует сам lxml, без промежуточной str
+
+- compile_selectors(selectors) -> List[правило]: простые селекторы -> правила для matches
+- matches(rules, name, attrs) -> bool: подходит ли элемент (имя тега и атрибуты) под одно из правил
+"""
+
+
+PARSE_MODE = os.environ.get('PARSE_MODE', 'partial')
+
+_SIMPLE_SELECTOR = re.compile(r'^(?P<tag>[\w-]+)?(?P<classes>(?:\.[\w-]+)*)(?P<attrs>(?:\[[^\]]+\])*)$')
+_ATTR = re.compile(r'\[\s*([\w-]+)\s*(?:=\s*["\']?([^"\'\]]*)["\']?)?\s*\]')
+
+# (тег или None, обязательные классы, обязательные атрибуты: имя -> значение или None)
+_Rule = Tuple[Optional[str], FrozenSet[str], Dict[str, Optional[str]]]
+
+
+def _compile_selector(selector: str) -> _Rule:
+    match = _SIMPLE_SELECTOR.match(selector.strip())
+    if not match:
+        raise ValueError(f'Неподдерживаемый селектор карточки: {selector!r}')
+
+    classes = frozenset(c for c in match.group('classes').split('.') if c)
+    attrs = {name: (value if value != '' else None) for name, value in _ATTR.findall(match.group('attrs'))}
+    return match.group('tag'), classes, attrs
+
+
+def compile_selectors(selectors: Iterable[str]) -> List[_Rule]:
+    return [_compile_selector(s) for s in selectors]
+
+
+def matches(rules: List[_Rule], name: str, attrs) -> bool:
+    attrs = attrs or {}
+    class_attr = attrs.get('class') or ''
+    tag_classes = set(class_attr.split() if isinstance(class_attr, str) else class_attr)
+
+    for tag, classes, required in rules:
+        if tag and tag != name:
+            continue
+        if not classes <= tag_classes:
+            continue
+        if all(attr in attrs and (value is None or attrs[attr] == value)
+               for attr, value in required.items()):
+            return True
+    return False
+
+
+if ElementFilter is not None:
+
+    class CardStrainer(ElementFilter):
+
+        def __init__(self, selectors: Iterable[str]):
+            self.selectors = list(selectors)
+            self.rules: List[_Rule] = compile_selectors(self.selectors)
+
+        def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+            # Вызывается только для элементов верхнего уровня: потомки карточки сохраняются целиком
+            return matches(self.rules, name, attrs)
+
+        def allow_string_creation(self, string) -> bool:
+            # Текст вне карточек не нужен
+            return False
+
+else:
+
+    class CardStrainer:
+
+        def __init__(self, selectors: Iterable[str]):
+            self.selectors = list(selectors)
+            self.rules: List[_Rule] = compile_selectors(self.selectors)
+
+
+def make_soup(markup, cards: Optional[CardStrainer] = None, mode: Optional[str] = None,
+              encoding: Optional[str] = None) -> BeautifulSoup:
+    mode = mode or PARSE_MODE
+    if mode == 'partial' and cards is not None and ElementFilter is not None:
+        return BeautifulSoup(markup, 'lxml', parse_only=cards, from_encoding=encoding)
+    return BeautifulSoup(markup, 'lxml', from_encoding=encoding)
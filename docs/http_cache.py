@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import news_item
+import singleflight
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+"""
+Дисковый HTTP-кэш с условными запросами
+
+Для каждого URL на диске хранятся тело ответа (<sha1>.body) и метаданные (<sha1>.json):
+ETag, Last-Modified, время сохранения и уже извлечённые из страницы результаты
+(словарь news, текст статьи). При обновлении HttpClient отправляет
+If-None-Match / If-Modified-Since; на ответ 304 страница не парсится заново,
+а Page.extract() возвращает сохранённый результат.
+
+Страницы статей после публикации почти не меняются, поэтому в течение ARTICLE_TTL
+секунд они отдаются из кэша вообще без запроса к сайту.
+
+Кэш общий для всех процессов (воркеры gunicorn, parse_pool): обновление записи
+идёт под межпроцессной блокировкой (lock), и процесс, дождавшийся её, берёт
+только что сохранённую другим процессом страницу вместо своего запроса.
+Результат разбора тоже пишется под блокировкой и только если на диске всё ещё то тело,
+которое разбиралось (digest - SHA-1 тела): иначе старый разбор попал бы к новому телу,
+и следующий 304 отдал бы не те новости.
+
+Кэш не растёт бесконечно: не чаще раза в PRUNE_INTERVAL секунд запись (store) удаляет
+записи, которые не обновлялись и не подтверждались дольше MAX_AGE секунд
+(по умолчанию - неделя, семь ARTICLE_TTL), и оставшиеся без записи временные файлы.
+Файлы блокировки не удаляются никогда: другой процесс может держать flock на уже
+открытом файле, и новый файл с тем же именем дал бы второй, независимый замок.
+
+Настройки: HTTP_CACHE (0 - выключить), HTTP_CACHE_DIR, HTTP_ARTICLE_TTL, HTTP_CACHE_MAX_AGE
+
+
+!!!! КЛАССЫ
+
+class DiskCache:   ///   Хранилище тел ответов, валидаторов и извлечённых результатов
+
+class Page:   ///   Скачанная (или взятая из кэша) страница
+
+
+!!!!  МЕТОД   ///   что делает
+
+DiskCache.load(self, url: str) -> Optional[Dict]:   ///   Метаданные записи или None
+
+DiskCache.body(self, url: str) -> Optional[bytes]:   ///   Сохранённое тело ответа или None
+
+DiskCache.store(self, url: str, body: bytes, etag: str, last_modified: str) -> Dict:   ///   Сохраняет новое тело (старые извлечённые результаты сбрасываются)
+
+DiskCache.touch(self, url: str) -> None:   ///   Отмечает, что запись подтверждена сайтом (ответ 304)
+
+DiskCache.save_extracted(self, url: str, kind: str, value, digest: str) -> bool:   ///   Сохраняет результат разбора тела с этим digest,
+    False - на диске уже другое тело
+
+DiskCache.lock(self, url: str):   ///   Межпроцессная блокировка записи (контекстный менеджер)
+
+DiskCache.prune(self, max_age: float = MAX_AGE) -> int:   ///   Удаляет записи старше max_age секунд, возвращает их число
+
+DiskCache.clear(self) -> None:   ///   Удаляет весь кэш
+
+Page.text   ///   Тело страницы, декодированное в заданной кодировке
+
+Page.stale   ///   True - сайт не ответил, это последняя сохранённая копия
+
+Page.digest   ///   SHA-1 тела страницы
+
+Page.extract(self, kind: str, func: Callable[[], Any]):   ///   Результат разбора: из кэша, если страница не менялась, иначе func()
+
+
+- body_digest(body) -> str: SHA-1 тела ответа (hex)
+"""
+
+
+CACHE_ENABLED = os.environ.get('HTTP_CACHE', '1') != '0'
+CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http_cache'))
+ARTICLE_TTL = float(os.environ.get('HTTP_ARTICLE_TTL', 24 * 60 * 60))
+MAX_AGE = float(os.environ.get('HTTP_CACHE_MAX_AGE', 7 * ARTICLE_TTL))
+# Обход каталога при записи - не чаще, чем раз в столько секунд
+PRUNE_INTERVAL = 10 * 60
+
+
+def body_digest(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class DiskCache:
+
+    def __init__(self, directory: str = CACHE_DIR, max_age: float = MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self._pruned_at = 0.0
+        # Ключи, чьи блокировки держит текущий поток (flock не реентерабелен)
+        self._held = threading.local()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.directory, self._key(url) + suffix)
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Запись через временный файл, чтобы параллельные читатели не видели половину файла
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_meta(self, url: str, meta: Dict) -> None:
+        self._write(self._path(url, '.json'), json.dumps(meta, ensure_ascii=False, default=news_item.to_json).encode('utf-8'))
+
+    def load(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._path(url, '.json'), 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def body(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._path(url, '.body'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, url: str, body: bytes, etag: str = '', last_modified: str = '') -> Dict:
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+            'digest': body_digest(body),
+            'extracted': {},
+        }
+        self._write(self._path(url, '.body'), body)
+        self._write_meta(url, meta)
+
+        if time.monotonic() - self._pruned_at > PRUNE_INTERVAL:
+            self._pruned_at = time.monotonic()
+            self.prune(self.max_age)
+        return meta
+
+    def touch(self, url: str) -> None:
+        meta = self.load(url)
+        if meta:
+            meta['stored_at'] = time.time()
+            self._write_meta(url, meta)
+
+    def save_extracted(self, url: str, kind: str, value: Any, digest: str) -> bool:
+        # Вызывается после разбора, когда блокировка скачивания уже отпущена
+        with self.lock(url):
+            meta = self.load(url)
+            if meta is None:
+                return False
+            stored = meta.get('digest')
+            if stored is None:
+                # Запись старой версии без digest - сверяем с самим телом
+                body = self.body(url)
+                stored = body_digest(body) if body is not None else None
+            if stored != digest:
+                return False
+            meta['digest'] = stored
+            meta['extracted'][kind] = value
+            self._write_meta(url, meta)
+            return True
+
+    @contextmanager
+    def _lock_key(self, key: str) -> Iterator[None]:
+        held = self._held.__dict__.setdefault('keys', set())
+        with singleflight.file_lock(os.path.join(self.directory, key + '.lock')):
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+
+    def lock(self, url: str):
+        return self._lock_key(self._key(url))
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def _mtime(self, name: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(os.path.join(self.directory, name))
+        except OSError:
+            return None
+
+    def prune(self, max_age: float = MAX_AGE) -> int:
+        # Возраст записи - mtime метаданных: их переписывают store, touch (304) и save_extracted
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in os.scandir(self.directory):
+            key, dot, suffix = entry.name.partition('.')
+            if not dot:
+                # Временный файл mkstemp, не переименованный из-за падения процесса
+                mtime = self._mtime(entry.name)
+                if mtime is not None and mtime < cutoff:
+                    self._remove(entry.name)
+                continue
+            # Запись, которую сейчас обновляет этот же поток (store под lock), не трогаем
+            if suffix != 'json' or key in self._held.__dict__.get('keys', ()):
+                continue
+
+            mtime = self._mtime(entry.name)
+            if mtime is None or mtime >= cutoff:
+                continue
+            # Под блокировкой записи: её не удалить посреди обновления другим процессом
+            with self._lock_key(key):
+                mtime = self._mtime(entry.name)
+                if mtime is None or mtime >= cutoff:
+                    continue
+                self._remove(key + '.json')
+                self._remove(key + '.body')
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+
+
+class Page:
+
+    def __init__(self, url: str, body: bytes, encoding: Optional[str] = 'utf-8',
+                 not_modified: bool = False,
+                 cache: Optional[DiskCache] = None,
+                 extracted: Optional[Dict[str, Any]] = None,
+                 stale: bool = False):
+        self.url = url
+        self.body = body
+        self.encoding = encoding or 'utf-8'
+        self.not_modified = not_modified
+        self.cache = cache
+        self.extracted = extracted or {}
+        self.stale = stale
+        self._digest: Optional[str] = None
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = body_digest(self.body)
+        return self._digest
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors='replace')
+
+    def extract(self, kind: str, func: Callable[[], Any]) -> Any:
+        # Страница не менялась - разбор уже был сделан раньше
+        if self.not_modified and kind in self.extracted:
+            return self.extracted[kind]
+
+        value = func()
+        self.extracted[kind] = value
+        if self.cache:
+            self.cache.save_extracted(self.url, kind, value, self.digest)
+        return value
@@ -0,0 +1,372 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import circuit
+import http_cache
+import metrics
+import singleflight
+
+
+"""
+Общий HTTP-клиент для всех парсеров
+
+Один requests.Session с пулами соединений по хостам (keep-alive, повторное
+использование TLS), таймаутами на соединение и чтение, повторами с
+экспоненциальной задержкой и ограничением числа одновременных запросов к одному хосту.
+
+Каждый запрос ограничен сроком (deadline): ожидание слота хоста, соединение, повторы и
+чтение тела должны уложиться в REQUEST_DEADLINE секунд, иначе DeadlineExceeded.
+Внешний код может сузить срок для группы запросов: with deadline(5): ...
+(срок хранится в contextvars и действует на все запросы внутри блока).
+Для каждого хоста работает предохранитель (circuit.CircuitBreaker): после серии
+неудач запросы к хосту на время паузы не отправляются вовсе. Неудачей считается только
+ответ самого сайта (ошибка, таймаут, 429/5xx), а не ожидание своего же слота хоста
+и не истечение более короткого срока вызывающего кода (with deadline(...)): таймауты
+попытки урезаются до остатка срока, и сработавший урезанный таймаут говорит о сроке
+вызывающего, а не о сайте. Собственный REQUEST_DEADLINE запроса - неудача сайта.
+Повторы (HTTP_RETRIES, пауза HTTP_BACKOFF * 2^n или Retry-After) делает сам клиент и только
+пока они помещаются в срок; последний ответ 429/5xx возвращается как есть.
+
+Если сайт не ответил (ошибка, срок истёк, предохранитель разомкнут, 5xx),
+fetch_page отдаёт последнюю сохранённую копию страницы из дискового кэша (Page.stale).
+
+Одновременные fetch_page одного URL объединяются: внутри процесса - singleflight.SingleFlight,
+между процессами - блокировкой записи дискового кэша (DiskCache.lock). Процесс, который
+ждал блокировку, получает сохранённую за это время страницу без своего запроса к сайту.
+
+Для страниц статей можно передать stop (streaming.ContainerStop; годится любой объект с feed(chunk) -> bool,
+например ограничение размера в images.py): тело ответа по мере чтения скармливается ему,
+и чтение обрывается, как только нужный контейнер прочитан (response.truncated).
+Оборванная страница попадает в дисковый кэш без ETag/Last-Modified (валидаторы относятся
+ко всей странице) и только если stop.cacheable.
+
+Настройки берутся из переменных окружения:
+HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF, HTTP_POOL_SIZE, HTTP_HOST_CONCURRENCY,
+HTTP_REQUEST_DEADLINE (и CIRCUIT_FAILURES, CIRCUIT_COOLDOWN в circuit.py)
+
+
+!!!! КЛАССЫ
+
+class HttpClient:   ///   HTTP-клиент с пулами соединений и лимитами по хостам
+
+class DeadlineExceeded(requests.Timeout):   ///   Срок запроса истёк
+
+
+!!!!  МЕТОД   ///   что делает
+
+get(self, url: str, stop=None, **kwargs) -> requests.Response:   ///   GET-запрос с таймаутами по умолчанию и лимитом на хост
+    (со stop - чтение тела до stop.feed(chunk) == True)
+
+fetch_text(self, url: str, encoding: str = 'utf-8') -> str:   ///   Скачивает страницу и возвращает текст в заданной кодировке
+
+fetch_page(self, url: str, encoding: str = 'utf-8', ttl: float = 0, stop=None) -> http_cache.Page:   ///   Условный запрос через дисковый кэш
+    (страница моложе ttl секунд берётся из кэша без запроса, иначе If-None-Match / If-Modified-Since;
+    если сайт недоступен - сохранённая копия со stale=True)
+
+
+- client: общий экземпляр HttpClient (с дисковым кэшем, если HTTP_CACHE не равен 0)
+- get(url, **kwargs), fetch_text(url, encoding='utf-8'), fetch_page(url, encoding='utf-8', ttl=0, stop=None): то же через общий client
+- deadline(seconds): контекстный менеджер, ограничивающий сроком все запросы внутри блока
+"""
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 15))
+RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+BACKOFF = float(os.environ.get('HTTP_BACKOFF', 0.5))
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HOST_CONCURRENCY = int(os.environ.get('HTTP_HOST_CONCURRENCY', 4))
+REQUEST_DEADLINE = float(os.environ.get('HTTP_REQUEST_DEADLINE', 20))
+
+# Срок проверяется после каждого куска: чем меньше кусок, тем точнее обрыв медленной отдачи
+CHUNK_SIZE = 8 * 1024
+
+# Ответы, после которых сайт считается больным (для предохранителя)
+FAILURE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Срок (time.monotonic()) для запросов текущего потока или задачи
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('http_deadline', default=None)
+
+
+class DeadlineExceeded(requests.Timeout):
+    pass
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    ends = time.monotonic() + seconds
+    outer = _deadline.get()
+    # Вложенный блок не может продлить внешний срок
+    token = _deadline.set(min(ends, outer) if outer is not None else ends)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+# Сколько пулов (хостов) держать открытыми одновременно
+POOL_HOSTS = 16
+# Таймаут сокета срабатывает чуть позже заданного: ошибка в пределах этого запаса до срока - истечение срока
+DEADLINE_SLACK = 0.05
+
+
+class HttpClient:
+
+    def __init__(self,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT,
+                 retries: int = RETRIES,
+                 backoff: float = BACKOFF,
+                 pool_size: int = POOL_SIZE,
+                 host_concurrency: int = HOST_CONCURRENCY,
+                 cache: Optional[http_cache.DiskCache] = None,
+                 request_deadline: float = REQUEST_DEADLINE,
+                 breakers: Optional[circuit.CircuitBreakers] = None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.host_concurrency = host_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.request_deadline = request_deadline
+        self.breakers = breakers if breakers is not None else circuit.CircuitBreakers()
+        self._flights = singleflight.SingleFlight()
+
+        # Повторы - в get(), а не в urllib3: каждая попытка и пауза перед ней укладываются в срок запроса
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size, max_retries=0)
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = threading.BoundedSemaphore(self.host_concurrency)
+                self._host_limits[host] = limit
+            return limit
+
+    def _ends(self) -> Tuple[float, bool]:
+        # (срок запроса, True - срок задал вызывающий код и он короче собственного)
+        ends = time.monotonic() + self.request_deadline
+        outer = _deadline.get()
+        if outer is not None and outer < ends:
+            return outer, True
+        return ends, False
+
+    def _read_body(self, response: requests.Response, ends: float, stop=None) -> None:
+        # Тело читается кусками, чтобы медленная отдача тоже укладывалась в срок
+        chunks = []
+        response.truncated = False
+        # Ошибки и редиректы читаются целиком: обрывать имеет смысл только саму страницу
+        stop = stop if response.status_code == 200 else None
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                if stop is not None and stop.feed(chunk):
+                    # Соединение с недочитанным телом закрывается, а не возвращается в пул
+                    response.truncated = True
+                    break
+                if time.monotonic() > ends:
+                    raise DeadlineExceeded(f'{response.url}: deadline exceeded while reading body')
+        finally:
+            response.close()
+        response._content = b''.join(chunks)
+
+    def get(self, url: str, stop=None, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        ends, callers = self._ends()
+
+        # Очередь за слотом хоста - наша, а не сайта: её таймаут предохранитель не считает
+        remaining = ends - time.monotonic()
+        limit = self._host_limit(host)
+        if remaining <= 0 or not limit.acquire(timeout=remaining):
+            metrics.HTTP_REQUESTS.inc(host=host, status='queue_timeout')
+            raise DeadlineExceeded(f'{url}: deadline exceeded while waiting for a connection slot')
+        try:
+            return self._get_with_breaker(url, host, ends, callers, stop, kwargs)
+        finally:
+            limit.release()
+
+    def _get_with_breaker(self, url: str, host: str, ends: float, callers: bool, stop,
+                          kwargs: Dict) -> requests.Response:
+        breaker = self.breakers.get(host)
+        if not breaker.allow():
+            metrics.HTTP_REQUESTS.inc(host=host, status='circuit_open')
+            raise circuit.CircuitOpenError(f'{host}: circuit open, source is failing')
+
+        try:
+            response, started = self._send_with_retries(url, ends, stop, kwargs)
+        except requests.RequestException:
+            if callers and time.monotonic() >= ends - DEADLINE_SLACK:
+                # Кончился срок вызывающего (короче таймаутов запроса) - сайт тут ни при чём
+                breaker.record_cancelled()
+                metrics.HTTP_REQUESTS.inc(host=host, status='deadline')
+            else:
+                breaker.record_failure()
+                metrics.HTTP_REQUESTS.inc(host=host, status='error')
+            raise
+        except BaseException:
+            # Пробный запрос не должен навсегда занять полуоткрытый предохранитель
+            breaker.record_cancelled()
+            raise
+
+        if response.status_code in FAILURE_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        # elapsed - до разбора заголовков ответа: соединение, DNS, TLS и ожидание сервера
+        metrics.HTTP_REQUEST_SECONDS.observe(response.elapsed.total_seconds(), host=host, phase='headers')
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, host=host, phase='total')
+        metrics.HTTP_REQUESTS.inc(host=host, status=response.status_code)
+        metrics.HTTP_RESPONSE_BYTES.inc(len(response.content), host=host)
+        if response.truncated:
+            metrics.HTTP_EARLY_ABORTS.inc(host=host)
+        return response
+
+    def _send_with_retries(self, url: str, ends: float, stop, kwargs: Dict):
+        # Повтор после ошибки соединения, таймаута или ответа 429/5xx с экспоненциальной паузой
+        # (или Retry-After сайта, если он дольше), но только если пауза и попытка влезают в срок
+        for attempt in range(self.retries + 1):
+            try:
+                response, started = self._send(url, ends, stop, kwargs)
+            except DeadlineExceeded:
+                raise
+            except (requests.ConnectionError, requests.Timeout):
+                if not self._pause_before_retry(attempt, ends, None):
+                    raise
+                continue
+
+            if response.status_code in FAILURE_STATUSES and self._pause_before_retry(attempt, ends, response):
+                continue
+            return response, started
+
+    def _pause_before_retry(self, attempt: int, ends: float, response: Optional[requests.Response]) -> bool:
+        if attempt >= self.retries:
+            return False
+
+        delay = self.backoff * 2 ** attempt
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.strip().isdigit():
+            delay = max(delay, float(retry_after))
+
+        # Пауза, после которой на попытку не останется времени, бессмысленна - отдаём то, что есть
+        if time.monotonic() + delay >= ends:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _send(self, url: str, ends: float, stop, kwargs: Dict):
+        remaining = ends - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'{url}: deadline exceeded')
+        # Таймауты каждой попытки - не дольше остатка срока
+        timeout = kwargs.get('timeout') or (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+        started = time.perf_counter()
+        response = self.session.get(url, stream=True, **dict(kwargs, timeout=timeout))
+        self._read_body(response, ends, stop)
+        return response, started
+
+    def fetch_text(self, url: str, encoding: Optional[str] = 'utf-8') -> str:
+        response = self.get(url)
+        if encoding:
+            response.encoding = encoding
+        return response.text
+
+    def fetch_page(self, url: str, encoding: Optional[str] = 'utf-8', ttl: float = 0,
+                   stop=None) -> http_cache.Page:
+        if not self.cache:
+            return http_cache.Page(url, self.get(url, stop=stop).content, encoding)
+
+        key = (url, encoding, ttl, stop.key if stop is not None else None)
+        return self._flights.do(key, lambda: self._fetch_cached(url, encoding, ttl, stop))
+
+    def _fetch_cached(self, url: str, encoding: Optional[str], ttl: float, stop) -> http_cache.Page:
+        requested_at = time.time()
+        with self.cache.lock(url):
+            return self._revalidate(url, encoding, ttl, requested_at, stop)
+
+    def _revalidate(self, url: str, encoding: Optional[str], ttl: float, requested_at: float,
+                    stop=None) -> http_cache.Page:
+        meta = self.cache.load(url)
+        body = self.cache.body(url) if meta else None
+        if body is None:
+            meta = None
+
+        # Свежая запись - сайт не трогаем
+        if meta and ttl and time.time() - meta['stored_at'] < ttl:
+            return http_cache.Page(url, body, encoding, True, self.cache, meta['extracted'])
+
+        # Пока ждали блокировку, страницу скачал или подтвердил другой процесс
+        if meta and meta['stored_at'] >= requested_at:
+            return http_cache.Page(url, body, encoding, True, self.cache, meta['extracted'])
+
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = self.get(url, stop=stop, headers=headers)
+        except requests.RequestException:
+            if meta is None:
+                raise
+            return self._stale_page(url, body, encoding, meta)
+
+        if response.status_code == 304 and meta:
+            self.cache.touch(url)
+            return http_cache.Page(url, body, encoding, True, self.cache, meta['extracted'])
+
+        if response.status_code == 200 and response.truncated:
+            # Без валидаторов: следующий условный запрос не должен получить 304 на обрезанную копию
+            if not stop.cacheable:
+                return http_cache.Page(url, response.content, encoding)
+            self.cache.store(url, response.content, '', '')
+            return http_cache.Page(url, response.content, encoding, False, self.cache)
+
+        if response.status_code == 200:
+            self.cache.store(url, response.content,
+                             response.headers.get('ETag', ''),
+                             response.headers.get('Last-Modified', ''))
+            return http_cache.Page(url, response.content, encoding, False, self.cache)
+
+        # Ошибка сайта - лучше последняя удачная копия, чем страница с ошибкой
+        if meta is not None and response.status_code >= 400:
+            return self._stale_page(url, body, encoding, meta)
+
+        return http_cache.Page(url, response.content, encoding)
+
+    def _stale_page(self, url: str, body: bytes, encoding: Optional[str], meta: Dict) -> http_cache.Page:
+        metrics.HTTP_STALE_RESPONSES.inc(host=urlsplit(url).netloc)
+        return http_cache.Page(url, body, encoding, True, self.cache, meta['extracted'], stale=True)
+
+
+client = HttpClient(cache=http_cache.DiskCache() if http_cache.CACHE_ENABLED else None)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return client.get(url, **kwargs)
+
+
+def fetch_text(url: str, encoding: Optional[str] = 'utf-8') -> str:
+    return client.fetch_text(url, encoding)
+
+
+def fetch_page(url: str, encoding: Optional[str] = 'utf-8', ttl: float = 0, stop=None) -> http_cache.Page:
+    return client.fetch_page(url, encoding, ttl, stop)
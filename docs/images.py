@@ -0,0 +1,300 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import http_client
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow не установлен - картинки отдаются без пережатия
+    Image = None
+
+
+"""
+Прокси картинок карточек с уменьшением и дисковым LRU-кэшем
+
+Вместо полноразмерных картинок ria.ru, habr и sport.ru шаблоны показывают
+/img?url=...: картинка скачивается один раз, уменьшается до размера карточки
+(THUMB_SIZE), пережимается в WebP (или JPEG, если Pillow собран без WebP)
+и хранится в IMAGE_CACHE_DIR. Размер кэша ограничен IMAGE_CACHE_BYTES: при
+переполнении удаляются давно не запрошенные файлы (время доступа - mtime файла).
+Адрес картинки не меняется, поэтому ответы можно кэшировать в браузере надолго.
+
+Картинки проксируются только с хостов источников (IMAGE_HOSTS), чтобы /img
+нельзя было использовать для запросов к произвольным адресам. Редиректы проверяются
+так же (каждый адрес цепочки, не больше MAX_REDIRECTS), а тело читается
+не больше MAX_IMAGE_BYTES - чтение обрывается, не дожидаясь конца ответа.
+
+Статические картинки (static/img/*.tiff, *.png) при запуске один раз
+пересохраняются в WebP рядом с исходником (convert_static), стили ссылаются на .webp.
+
+Отдаются только растровые картинки (JPEG, PNG, GIF, WebP): Content-Type сайта не
+учитывается, формат определяется по самим байтам. С Pillow ответ - всегда пережатая
+им картинка; если Pillow не смог её декодировать (SVG, HTML под видом image/*,
+битый файл), /img отвечает 404. SVG не проксируется никогда: скрипт в нём
+выполнился бы от имени нашего сайта.
+
+Pillow - необязательная зависимость: без неё растровые картинки отдаются как есть
+(но из кэша), а конвертация статики пропускается. Ошибки конвертации статики
+(каталог только для чтения, битый файл) пишутся в лог и не мешают запуску.
+
+Настройки: IMAGE_CACHE_DIR, IMAGE_CACHE_BYTES, IMAGE_THUMB_WIDTH, IMAGE_THUMB_HEIGHT,
+IMAGE_QUALITY, IMAGE_MAX_BYTES, IMAGE_FETCH_DEADLINE
+
+
+!!!! КЛАСС
+
+class ThumbnailCache:   ///   Дисковый LRU-кэш уменьшенных картинок
+
+
+!!!!  МЕТОД   ///   что делает
+
+get(self, url: str) -> Optional[Tuple[bytes, str]]:   ///   (байты, Content-Type) из кэша или None
+
+put(self, url: str, data: bytes, content_type: str) -> None:   ///   Сохраняет картинку и вытесняет старые при переполнении
+
+clear(self) -> None:   ///   Удаляет весь кэш
+
+
+- thumbnail(url) -> Optional[Tuple[bytes, str]]: уменьшенная картинка (из кэша или скачанная), None если недоступна
+- is_allowed(url) -> bool: можно ли проксировать картинку с этого адреса
+- sniff_type(data) -> Optional[str]: Content-Type растровой картинки по её первым байтам или None
+- convert_static(directory) -> List[str]: пересохраняет TIFF/PNG из directory в WebP, возвращает новые файлы
+- cache: общий экземпляр ThumbnailCache
+"""
+
+
+CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.image_cache'))
+CACHE_BYTES = int(os.environ.get('IMAGE_CACHE_BYTES', 200 * 1024 * 1024))
+
+THUMB_SIZE = (int(os.environ.get('IMAGE_THUMB_WIDTH', 480)), int(os.environ.get('IMAGE_THUMB_HEIGHT', 320)))
+QUALITY = int(os.environ.get('IMAGE_QUALITY', 80))
+# Больше не качаем: это уже не картинка карточки
+MAX_IMAGE_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+MAX_REDIRECTS = 3
+# /img отвечает пользователю сразу - долго ждать сайт картинки нельзя
+FETCH_DEADLINE = float(os.environ.get('IMAGE_FETCH_DEADLINE', 5))
+
+# Хосты источников и их CDN (совпадение по окончанию имени)
+IMAGE_HOSTS = ('ria.ru', 'habr.com', 'habrastorage.org', 'hsto.org', 'sport.ru', 'k-obr.spb.ru')
+
+STATIC_CONVERT_EXTENSIONS = ('.tiff', '.tif', '.png')
+
+# Сигнатуры растровых форматов, которые можно отдавать как есть (без Pillow)
+RASTER_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+log = logging.getLogger(__name__)
+
+if Image is not None and features.check('webp'):
+    OUTPUT_FORMAT, OUTPUT_TYPE = 'WEBP', 'image/webp'
+else:
+    OUTPUT_FORMAT, OUTPUT_TYPE = 'JPEG', 'image/jpeg'
+
+# Всё, что /img вообще может отдать
+SERVED_TYPES = frozenset([content_type for _, content_type in RASTER_SIGNATURES] + ['image/webp', OUTPUT_TYPE])
+
+
+class ThumbnailCache:
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def get(self, url: str) -> Optional[Tuple[bytes, str]]:
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Отметка использования для LRU
+            os.utime(path)
+        except OSError:
+            return None
+
+        # Первая строка файла - Content-Type; записи старых версий (например, SVG) не отдаются
+        content_type, _, body = data.partition(b'\n')
+        content_type = content_type.decode('ascii', errors='replace')
+        if content_type not in SERVED_TYPES:
+            return None
+        return body, content_type
+
+    def put(self, url: str, data: bytes, content_type: str) -> None:
+        path = self._path(url)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content_type.encode('ascii') + b'\n' + data)
+
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Удаляем давно не запрошенные, пока не освободим четверть лимита
+        entries = sorted((entry for entry in os.scandir(self.directory)
+                          if entry.is_file() and not entry.name.endswith('.tmp')),
+                         key=lambda entry: entry.stat().st_mtime)
+        target = self.max_bytes * 3 // 4
+        for entry in entries:
+            if self._size <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                os.remove(entry.path)
+            self._size = 0
+
+
+cache = ThumbnailCache()
+
+
+def is_allowed(url: str) -> bool:
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return False
+    host = parts.hostname.lower()
+    return any(host == allowed or host.endswith('.' + allowed) for allowed in IMAGE_HOSTS)
+
+
+def sniff_type(data: bytes) -> Optional[str]:
+    for signature, content_type in RASTER_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _resize(data: bytes) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', THUMB_SIZE)  # JPEG декодируется сразу в уменьшенном масштабе
+        image.thumbnail(THUMB_SIZE)
+        if OUTPUT_FORMAT == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        output = io.BytesIO()
+        image.save(output, OUTPUT_FORMAT, quality=QUALITY)
+        return output.getvalue()
+
+
+class _ByteLimit:
+
+    # stop для http_client.get: обрывает чтение тела, как только оно длиннее limit
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.read = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        self.read += len(chunk)
+        return self.read > self.limit
+
+
+def _fetch(url: str):
+    # Редиректы - вручную: адрес каждого перехода должен быть среди хостов источников
+    for _ in range(MAX_REDIRECTS + 1):
+        response = http_client.get(url, stop=_ByteLimit(MAX_IMAGE_BYTES), allow_redirects=False)
+        location = response.headers.get('Location')
+        if not (response.is_redirect and location):
+            return response
+        url = urljoin(url, location)
+        if not is_allowed(url):
+            return None
+    return None
+
+
+def thumbnail(url: str) -> Optional[Tuple[bytes, str]]:
+    if not is_allowed(url):
+        return None
+
+    cached = cache.get(url)
+    if cached is not None:
+        return cached
+
+    try:
+        with http_client.deadline(FETCH_DEADLINE):
+            response = _fetch(url)
+    except Exception:
+        return None
+    if response is None or response.status_code != 200 or response.truncated:
+        return None
+
+    data = response.content
+    # Заголовок сайта не в счёт: отдаём только то, что по байтам - растровая картинка
+    content_type = sniff_type(data)
+    if content_type is None:
+        return None
+    if Image is not None:
+        try:
+            data, content_type = _resize(data), OUTPUT_TYPE
+        except Exception:
+            # Pillow не смог декодировать - это не картинка (или битая), не отдаём
+            return None
+
+    cache.put(url, data, content_type)
+    return data, content_type
+
+
+def _convert(source: str, target: str) -> None:
+    with Image.open(source) as image:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        image.save(target, 'WEBP', quality=QUALITY, method=6)
+
+
+def convert_static(directory: str) -> List[str]:
+    if Image is None or OUTPUT_FORMAT != 'WEBP':
+        return []
+
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError as e:
+        log.warning('static images in %s are not converted: %s', directory, e)
+        return []
+
+    converted = []
+    for name in names:
+        root, extension = os.path.splitext(name)
+        if extension.lower() not in STATIC_CONVERT_EXTENSIONS:
+            continue
+
+        source = os.path.join(directory, name)
+        target = os.path.join(directory, root + '.webp')
+        try:
+            # Уже сконвертировано и исходник с тех пор не менялся
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                continue
+            _convert(source, target)
+        except Exception as e:
+            # Каталог только для чтения или битый файл: стили останутся без этой .webp, приложение запускается
+            log.warning('%s is not converted to WebP: %s', source, e)
+            continue
+        converted.append(target)
+    return converted
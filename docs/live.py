@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+import news_item
+
+
+"""
+Живая лента: новые карточки разделов для открытых вкладок (Server-Sent Events)
+
+Производитель один - фоновое обновление FeedCache: LiveFeed подписан на него (add_listener)
+и при каждом обновлении раздела сравнивает ссылки с прошлой лентой раздела.
+Карточки с новыми ссылками становятся событием с номером по порядку и попадают
+в общий кольцевой буфер последних MAX_EVENTS событий.
+
+Подписчики (вкладки) ничего не качают и не держат своих очередей: каждый ждёт
+на общем Condition новых событий после своего номера. Тысяча открытых вкладок -
+это одно обновление раздела за интервал и одно уведомление notify_all на событие.
+Переподключившийся браузер присылает Last-Event-ID и получает пропущенные события
+из буфера (если они ещё не вытеснены).
+
+Клиент по умолчанию - опрос /api/live/poll раз в POLL_INTERVAL секунд без ожидания:
+каждый запрос - выборка из буфера в памяти, поток сервера не занят между опросами.
+Поток SSE (/api/live) держит поток Flask (а у синхронного gunicorn - целый воркер)
+всё время, пока открыта вкладка; для тысяч вкладок его включают (LIVE_SSE=1) только
+с асинхронными воркерами: gunicorn -k gevent --worker-connections 2000 main:app.
+
+Первая лента раздела после запуска ничего не рассылает - она только запоминается
+(или задаётся заранее через seed, например лентой из ArticleStore).
+
+Настройки: LIVE_KEEPALIVE (секунд между комментариями keep-alive в потоке), LIVE_MAX_EVENTS,
+LIVE_POLL_INTERVAL (секунд между опросами страницы), LIVE_SSE (1 - страницы подключаются к потоку SSE)
+
+
+!!!! КЛАСС
+
+class LiveFeed:   ///   Новые карточки разделов и рассылка их подписчикам
+
+
+!!!!  МЕТОД   ///   что делает
+
+seed(self, name: str, result: Dict[str, List]) -> None:   ///   Запоминает ленту раздела без рассылки (если раздел ещё не известен)
+
+publish(self, name: str, result: Dict[str, List]) -> List[Dict]:   ///   Слушатель FeedCache: новые по ссылке карточки раздела - новое событие
+
+last_id(self) -> int:   ///   Номер последнего события (0 - событий ещё не было)
+
+wait(self, after: int, timeout: float, names: Optional[Iterable[str]] = None) -> List[Tuple[int, str, List[Dict]]]:   ///   События после номера after,
+    при их отсутствии ждёт не дольше timeout секунд; names - только эти разделы
+
+stream(self, after: int = 0, names: Optional[Iterable[str]] = None) -> Iterator[str]:   ///   Бесконечный поток text/event-stream для ответа Flask
+
+
+- format_event(event_id, name, items) -> str: одно событие в формате SSE (event: news, data - JSON {'section', 'news'})
+- live: общий экземпляр LiveFeed (main.py подписывает его на feed_cache.feeds)
+"""
+
+
+KEEPALIVE = float(os.environ.get('LIVE_KEEPALIVE', 15))
+MAX_EVENTS = int(os.environ.get('LIVE_MAX_EVENTS', 1000))
+POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', 30))
+SSE_ENABLED = os.environ.get('LIVE_SSE', '0') == '1'
+# Через сколько миллисекунд браузер переподключается после обрыва
+RETRY_MS = 5000
+
+Event = Tuple[int, str, List[Dict]]
+
+
+def _links(result: Mapping) -> Set[str]:
+    return {item['link'] for item in result.get('news', []) if item.get('link')}
+
+
+def format_event(event_id: int, name: str, items: List[Dict]) -> str:
+    data = json.dumps({'section': name, 'news': items}, ensure_ascii=False, default=news_item.to_json)
+    return f'id: {event_id}\nevent: news\ndata: {data}\n\n'
+
+
+class LiveFeed:
+
+    def __init__(self, max_events: int = MAX_EVENTS, keepalive: float = KEEPALIVE):
+        self.keepalive = keepalive
+        self._links: Dict[str, Set[str]] = {}
+        self._events: Deque[Event] = deque(maxlen=max_events)
+        self._last_id = 0
+        self._changed = threading.Condition()
+
+    def seed(self, name: str, result: Dict[str, List]) -> None:
+        with self._changed:
+            if name not in self._links and result and result.get('news'):
+                self._links[name] = _links(result)
+
+    def publish(self, name: str, result: Dict[str, List]) -> List[Dict]:
+        links = _links(result)
+        with self._changed:
+            previous = self._links.get(name)
+            self._links[name] = links
+            if previous is None:
+                return []
+
+            fresh = []
+            for item in result['news']:
+                link = item.get('link')
+                if link and link not in previous:
+                    previous.add(link)
+                    fresh.append(dict(item, section=name))
+            if not fresh:
+                return []
+
+            self._last_id += 1
+            self._events.append((self._last_id, name, fresh))
+            self._changed.notify_all()
+        return fresh
+
+    def last_id(self) -> int:
+        return self._last_id
+
+    def _after(self, after: int, names: Optional[Set[str]]) -> List[Event]:
+        # Буфер упорядочен по номерам: идём с конца до первого уже отданного
+        result = []
+        for event in reversed(self._events):
+            if event[0] <= after:
+                break
+            if names is None or event[1] in names:
+                result.append(event)
+        result.reverse()
+        return result
+
+    def wait(self, after: int, timeout: float, names: Optional[Iterable[str]] = None) -> List[Event]:
+        names = set(names) if names is not None else None
+        with self._changed:
+            events = self._after(after, names)
+            if events:
+                return events
+            # Пробуждение на событие чужого раздела не продлевает ожидание
+            self._changed.wait(timeout)
+            return self._after(after, names)
+
+    def stream(self, after: int = 0, names: Optional[Iterable[str]] = None) -> Iterator[str]:
+        names = list(names) if names is not None else None
+        # Новая вкладка получает только то, что появится после подключения
+        after = after or self.last_id()
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            events = self.wait(after, self.keepalive, names)
+            if not events:
+                # Комментарий держит соединение (и прокси) живым и выявляет закрытые вкладки
+                yield ': keepalive\n\n'
+                continue
+            for event_id, name, items in events:
+                yield format_event(event_id, name, items)
+            after = events[-1][0]
+
+
+live = LiveFeed()
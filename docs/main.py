@@ -1,21 +1,135 @@
-from flask import Flask, request, render_template
+import os
+import threading
 
-import Parsing_politics_science_health as PSH
-import Parsing_sport_IT_education as SIE
+from flask import Flask, Response, request, render_template, jsonify
+from flask.json.provider import DefaultJSONProvider
 
+import crawler
+import feed_export
+import http_client
+import images
+import metrics
+import news_item
+import sections
+import sources
+from feed_cache import feeds
+import live as live_feed
+from live import live
+from response_cache import exports, pages
+from search import index
+from store import store
+from timeline import MAX_PAGE_SIZE, PAGE_SIZE, timeline
+
+
+
+class NewsJSONProvider(DefaultJSONProvider):
+
+    @staticmethod
+    def default(o):
+        # Карточки NewsItem в ответах /api/* - как обычные словари
+        try:
+            return news_item.to_json(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
 
 
 app = Flask(__name__)
+app.json = NewsJSONProvider(app)
+
+# Корень сайта для ссылок в RSS/Atom. Берётся из настроек, а не из заголовка Host:
+# иначе поддельный Host попал бы в ссылки ленты и заводил бы новые записи кэша
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000').rstrip('/') + '/'
+
+def after_ingest(name):
+    index.sync(store)
+    # В базе появились превью карточек раздела - новая версия ленты, страницы перерисуются.
+    # Версия растёт и после пустого прохода: превью мог сохранить другой воркер;
+    # одинаковая страница получит тот же ETag, и браузеры по-прежнему получат 304
+    feeds.touch(name)
+
+
+ingester = crawler.BackgroundIngest(after=after_ingest)
+init_lock = threading.Lock()
+initialized = False
+
+
+def init_app():
+    # Запуск только в обслуживающем процессе, при первом запросе, а не при импорте:
+    # процессы parse_pool (spawn/forkserver) импортируют этот модуль заново
+    # и не должны ни конвертировать статику, ни поднимать ленты, ни подписываться на них
+    global initialized
+    with init_lock:
+        if initialized:
+            return
+
+        # Тяжёлые TIFF/PNG из static/img один раз пересохраняются в WebP (нужен Pillow)
+        images.convert_static(os.path.join(app.static_folder, 'img'))
+
+        # После перезапуска ленты сразу поднимаются из базы статей, пока идёт первое обновление
+        # (и запоминаются живой лентой, чтобы первое обновление не разослало их как новые)
+        for name in sections.SECTIONS:
+            warm_news = store.latest_news(name)
+            feeds.warm(name, warm_news)
+            live.seed(name, warm_news)
+
+        # Каждая обновлённая лента: новые ссылки - сразу открытым вкладкам через /api/live;
+        # новые карточки и их тексты - в базу, изменения базы - в поисковый индекс (в фоновом потоке:
+        # обновление ленты, в том числе /api/sections?fresh=1, не ждёт скачивания статей)
+        feeds.add_listener(live.publish)
+        feeds.add_listener(ingester.submit)
+        initialized = True
+
+
+@app.before_request
+def start_feeds():
+    # Ленты обновляются в фоне, маршруты читают только из памяти
+    if not initialized:
+        init_app()
+    feeds.start()
 
 cnt = list(range(1))
 
 
+def query_arg(name, default, kind, low, high):
+    # Неразборчивое значение (?limit=abc, nan) - значение по умолчанию, а не 500; остальное - в границах
+    value = request.args.get(name, default, type=kind)
+    if value != value:
+        value = default
+    return max(low, min(value, high))
+
+
+def with_previews(news):
+    # Превью посчитаны заранее при сохранении статей - здесь только выборка из базы
+    previews = store.previews(item['link'] for item in news)
+    return [dict(item, preview=previews.get(item['link'], '')) for item in news]
+
+
+def render_cached(key, template, news, version, **context):
+    # Страница рендерится и сжимается один раз на версию данных, повторные запросы получают
+    # готовые байты или 304 без обращения к базе. Превью входят в версию: после сохранения
+    # превью раздела лента получает новую версию (FeedCache.touch в after_ingest).
+    # key - маршрут и только те аргументы, от которых зависит страница: мусорный ?x=1
+    # не заводит новую запись и не вытесняет настоящие страницы
+    page = pages.get(key, version, lambda: render_template(template, news=with_previews(news), **context))
+    return page.response(request)
+
+
+def render_section(template, section, **context):
+    # Версия и лента читаются вместе: иначе старая лента закэшировалась бы под новой версией
+    version, result = feeds.snapshot(section)
+    return render_cached(request.endpoint, template, result['news'], version, live_section=section,
+                         live_sse=live_feed.SSE_ENABLED, live_poll_interval=live_feed.POLL_INTERVAL, **context)
+
+
 @app.route('/')
 def base():
-    arr = SIE.parse_latest_news_it(SIE.URL_IT)
-    return render_template('base.html', 
-                            news=arr["news"],
-                            countF=cnt)
+    # Общая лента всех разделов по времени публикации, ?cursor= - следующая страница
+    cursor = request.args.get('cursor', '')
+    # Версия - до чтения лент: обновление между ними даст лишний рендер, но не устаревшую страницу под новой версией
+    version = timeline.version()
+    news, next_cursor = timeline.page(PAGE_SIZE, cursor)
+    return render_cached((request.endpoint, cursor), 'base.html', news, version,
+                         countF=cnt, next_cursor=next_cursor)
 
 
 @app.route('/pronget')
@@ -25,52 +139,155 @@ def pronget():
 
 @app.route('/pol')
 def pol():
-    arr = PSH.parse_latest_news_politics(PSH.URL_POLITICS)
-    return render_template('pol.html',
-                           news=arr["news"]
-                           )
+    return render_section('pol.html', 'politics')
 
 
 @app.route('/it')
 def it():
-    arr = SIE.parse_latest_news_it(SIE.URL_IT)
-    return render_template('it.html',
-                           news=arr["news"]
-                           )
+    return render_section('it.html', 'it')
 
 
 @app.route('/sp')
 def sp():
-    arr = SIE.parse_latest_news_sport(SIE.URL_SPORT)
-    return render_template('sport.html',
-                           news=arr["news"]
-                           )
+    return render_section('sport.html', 'sport')
 
 
 @app.route('/educ')
 def educ():
-    arr = SIE.parse_latest_news_education(SIE.URL_EDUCATION)
-    return render_template('educ.html',
-                           news=arr["news"]
-                           )
+    return render_section('educ.html', 'education')
 
 
 @app.route('/healph')
 def heal():
-    arr = PSH.parse_latest_news_health(PSH.URL_HEALTH)
-    return render_template('heal.html',
-                           news=arr["news"]
-                           )
+    return render_section('heal.html', 'health')
 
 
 @app.route('/science')
 def scin():
-    arr = PSH.parse_latest_news_science(PSH.URL_SCIENCE)
-    return render_template('scin.html',
-                           news=arr["news"]
+    return render_section('scin.html', 'science')
+
+
+
+@app.route('/api/sections')
+def api_sections():
+    # ?fresh=1 - параллельно перекачать все разделы, иначе отдать кэш
+    if request.args.get('fresh'):
+        result = sections.fetch_all_sections(timeout=query_arg('timeout', 15.0, float, 1.0, 60.0))
+        for name, news in result['sections'].items():
+            feeds.update(name, news)
+        return jsonify(result)
+
+    return jsonify({'sections': {name: feeds.get(name) for name in sections.SECTIONS},
+                    'errors': {}})
+
+
+@app.route('/feed/<section>.<fmt>')
+def feed_export_route(section, fmt):
+    # Лента раздела в JSON / RSS / Atom: строится и сжимается один раз на версию ленты,
+    # дальше - готовые байты или 304 по ETag
+    if section not in sections.SECTIONS or fmt not in feed_export.FORMATS:
+        return Response(status=404)
+
+    content_type, serialize = feed_export.FORMATS[fmt]
+    version, result = feeds.snapshot(section)
+    feed = exports.get((section, fmt), version,
+                       lambda: serialize(section, result['news'], SITE_URL), content_type)
+    return feed.response(request)
+
+
+@app.route('/api/timeline')
+def api_timeline():
+    news, next_cursor = timeline.page(query_arg('limit', PAGE_SIZE, int, 1, MAX_PAGE_SIZE), request.args.get('cursor', ''))
+    return jsonify({'news': news, 'next_cursor': next_cursor})
+
+
+def live_sections():
+    # ?section=politics,it - только эти разделы, без параметра - все
+    names = [name for name in request.args.get('section', '').split(',') if name in sections.SECTIONS]
+    return names or None
+
+
+@app.route('/api/live')
+def api_live():
+    # Поток Server-Sent Events: новые карточки разделов по мере обновления лент.
+    # Все вкладки ждут одно и то же обновление FeedCache, сами ничего не качают.
+    # Соединение занимает поток, пока открыта вкладка: страницы подключаются сюда
+    # только при LIVE_SSE=1 и асинхронных воркерах (gunicorn -k gevent), иначе - опрос /api/live/poll
+    after = request.headers.get('Last-Event-ID', request.args.get('after', ''))
+    after = int(after) if after.isdigit() else 0
+    response = Response(live.stream(after, live_sections()), content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/live/poll')
+def api_live_poll():
+    # Опрос живой ленты (клиент страниц разделов по умолчанию): события после ?after=,
+    # при их отсутствии ждёт не дольше ?timeout= секунд (страницы шлют timeout=0 - поток не держится)
+    after = request.args.get('after', '')
+    if not after.isdigit():
+        # Первый запрос - только номер, с которого ждать
+        return jsonify({'events': [], 'last_id': live.last_id()})
+
+    timeout = query_arg('timeout', live.keepalive, float, 0.0, 60.0)
+    events = live.wait(int(after), timeout, live_sections())
+    return jsonify({'events': [{'id': event_id, 'section': name, 'news': items} for event_id, name, items in events],
+                    'last_id': events[-1][0] if events else int(after)})
+
+
+@app.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    index.sync(store)
+    results = index.search(query, limit=50, section=request.args.get('section')) if query else []
+    return render_template('search.html',
+                           query=query,
+                           news=results
                            )
 
 
+@app.route('/api/search')
+def api_search():
+    index.sync(store)
+    results = index.search(request.args.get('q', ''),
+                           limit=query_arg('limit', 20, int, 1, MAX_PAGE_SIZE),
+                           section=request.args.get('section'))
+    return jsonify({'news': results})
+
+
+@app.route('/img')
+def thumbnail():
+    result = images.thumbnail(request.args.get('url', ''))
+    if result is None:
+        return Response(status=404)
+
+    data, content_type = result
+    response = Response(data, content_type=content_type)
+    # Один адрес - всегда одна и та же картинка
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    # Тип определён по байтам картинки - браузер не должен угадывать его заново
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Состояние лент считается в момент запроса, остальные метрики копятся по ходу работы
+    for name in sections.SECTIONS:
+        age = feeds.age(name)
+        if age is not None:
+            metrics.FEED_AGE_SECONDS.set(round(age, 3), section=name)
+        metrics.FEED_CARDS.set(len(feeds.get(name)['news']), section=name)
+    for source, fields in sources.selector_stats.snapshot().items():
+        for field, selectors in fields.items():
+            for selector, count in selectors.items():
+                metrics.SELECTOR_HITS.set(count, source=source, field=field, selector=selector)
+    for host, state in http_client.client.breakers.snapshot().items():
+        metrics.CIRCUIT_OPEN.set(int(state != 'closed'), host=host)
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
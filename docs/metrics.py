@@ -0,0 +1,232 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+"""
+Метрики в памяти и их вывод в текстовом формате Prometheus (маршрут /metrics)
+
+Счётчики и гистограммы без внешних зависимостей: запись - один захват блокировки
+и bisect по границам корзин, поэтому инструментирование можно не выключать в продакшене.
+
+Этапы обработки страницы (parse_stage_seconds, stage):
+- parse: декодирование байтов (делает сам lxml, на sport.ru - из windows-1251) и построение дерева lxml/BeautifulSoup
+- extract: разбор карточек или текста статьи
+Сеть считается в http_client по хостам: http_request_seconds{phase="headers"} - соединение,
+DNS, TLS и ожидание заголовков (response.elapsed), phase="total" - вместе с телом ответа.
+
+Разбор в пуле процессов (parse_pool, PARSE_WORKERS > 0) пишет метрики этапов в память
+процессов пула, а не основного - как и sources.selector_stats.
+
+
+!!!! КЛАССЫ
+
+class Counter:   ///   Монотонный счётчик с метками
+
+class Gauge:   ///   Текущее значение с метками
+
+class Histogram:   ///   Гистограмма с фиксированными корзинами
+
+class Registry:   ///   Набор метрик и их вывод
+
+
+!!!!  МЕТОД   ///   что делает
+
+Counter.inc(self, amount: float = 1, **labels) -> None:   ///   Увеличивает счётчик
+
+Gauge.set(self, value: float, **labels) -> None:   ///   Задаёт значение
+
+Histogram.observe(self, value: float, **labels) -> None:   ///   Добавляет наблюдение
+
+Histogram.time(self, **labels):   ///   Контекстный менеджер: наблюдение - длительность блока в секундах
+
+Registry.render(self) -> str:   ///   Все метрики в текстовом формате Prometheus
+
+
+- registry: общий экземпляр Registry, в нём объявлены все метрики ниже
+- stage(source, stage): контекстный менеджер замера этапа разбора (ошибки считаются в parse_errors_total)
+- CONTENT_TYPE: Content-Type ответа /metrics
+"""
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы корзин в секундах: от миллисекунды (разбор карточки) до десятков секунд (медленный сайт)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in values]
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [число наблюдений по корзинам (без накопления), сумма, количество]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_seconds', 'HTTP request duration by host (headers: connect, TLS and wait for headers; total: with body)',
+    ('host', 'phase'))
+HTTP_REQUESTS = registry.counter('http_requests_total', 'HTTP requests by host and status', ('host', 'status'))
+HTTP_RESPONSE_BYTES = registry.counter('http_response_bytes_total', 'HTTP response body bytes by host', ('host',))
+HTTP_STALE_RESPONSES = registry.counter(
+    'http_stale_responses_total', 'Cached pages served because the source failed, by host', ('host',))
+HTTP_EARLY_ABORTS = registry.counter(
+    'http_early_aborts_total', 'Responses cut off early by the caller (article container read, size limit), by host', ('host',))
+CIRCUIT_OPEN = registry.gauge('circuit_open', 'Whether the circuit breaker of a host is open (1) or closed (0)', ('host',))
+
+PARSE_STAGE_SECONDS = registry.histogram(
+    'parse_stage_seconds', 'Page processing stage duration by source (parse, extract)', ('source', 'stage'))
+PARSE_BYTES = registry.counter('parse_input_bytes_total', 'Page bytes handed to the parser by source', ('source',))
+PARSE_CARDS = registry.counter('parse_cards_total', 'News cards extracted by source', ('source',))
+PARSE_ERRORS = registry.counter('parse_errors_total', 'Page processing errors by source and stage', ('source', 'stage'))
+
+SELECTOR_HITS = registry.gauge(
+    'selector_hits', 'Matches of each fallback selector by source and field (empty selector: none matched)',
+    ('source', 'field', 'selector'))
+
+FEED_AGE_SECONDS = registry.gauge('feed_age_seconds', 'Age of the cached section feed', ('section',))
+FEED_CARDS = registry.gauge('feed_cards', 'Cards in the cached section feed', ('section',))
+
+
+@contextmanager
+def stage(source: str, stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PARSE_ERRORS.inc(source=source, stage=stage)
+        raise
+    finally:
+        PARSE_STAGE_SECONDS.observe(time.perf_counter() - started, source=source, stage=stage)
@@ -0,0 +1,198 @@
+import sys
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+"""
+Компактное представление карточки новости и колоночный контейнер для больших наборов
+
+NewsItem хранит пять полей карточки (title, date, time, image, link) и нормализованное
+время публикации published (ISO 8601 с поясом, см. timestamps.py) в __slots__,
+а не в словаре, и при этом ведёт себя как словарь только для чтения: item['title'],
+item.get('image', ''), 'link' in item, dict(item), сравнение со словарями.
+Поэтому шаблоны (new['title']) и код, который вызывает parse_latest_news_*, работают без изменений.
+Дополнительные поля (preview, section, score, ...) лежат в отдельном словаре,
+который создаётся только если они есть.
+
+NewsBatch хранит много карточек по столбцам: один список на поле, повторяющиеся строки
+(даты, время, раздел) интернируются. Подходит для архивов на десятки тысяч записей
+(поисковый индекс, ленты за долгий период); элемент по индексу - NewsItem.
+
+Оба типа переводятся в JSON через to_json() (см. http_cache и JSON-провайдер в main.py).
+
+
+!!!! КЛАССЫ
+
+class NewsItem(Mapping):   ///   Карточка новости со слотами вместо словаря
+
+class NewsBatch(Sequence):   ///   Колоночный набор карточек
+
+
+!!!!  МЕТОД   ///   что делает
+
+NewsItem.from_mapping(cls, data: Mapping) -> NewsItem:   ///   Из словаря формата news (лишние ключи - в дополнительные поля)
+
+NewsItem.replace(self, **fields) -> NewsItem:   ///   Копия с изменёнными или добавленными полями
+
+NewsItem.to_dict(self) -> Dict[str, Any]:   ///   Обычный словарь
+
+NewsBatch.append(self, item: Mapping) -> int:   ///   Добавляет карточку, возвращает её индекс
+
+NewsBatch.column(self, field: str) -> List:   ///   Столбец поля (без копирования)
+
+NewsBatch.to_dicts(self) -> List[Dict[str, Any]]:   ///   Список обычных словарей
+
+
+- NEWS_FIELDS: поля карточки в порядке контракта {'news': [...]}
+- ITEM_FIELDS: NEWS_FIELDS и published - поля, которые хранятся в слотах
+- wrap_news(result) -> Dict[str, List]: результат парсинга с карточками NewsItem
+- to_json(value): замена для json.dumps(default=...)
+"""
+
+
+NEWS_FIELDS = ('title', 'date', 'time', 'image', 'link')
+ITEM_FIELDS = NEWS_FIELDS + ('published',)
+
+# Значения этих полей часто повторяются - храним одну копию строки
+INTERNED_FIELDS = frozenset({'date', 'time', 'section'})
+
+
+def _intern(field: str, value: Any) -> Any:
+    if field in INTERNED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class NewsItem(Mapping):
+
+    __slots__ = ITEM_FIELDS + ('_extra',)
+
+    def __init__(self, title: str = '', date: str = '', time: str = '', image: str = '', link: str = '',
+                 published: str = '', **extra):
+        self.title = title
+        self.date = _intern('date', date)
+        self.time = _intern('time', time)
+        self.image = image
+        self.link = link
+        self.published = published
+        self._extra: Optional[Dict[str, Any]] = (
+            {field: _intern(field, value) for field, value in extra.items()} if extra else None)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> 'NewsItem':
+        if type(data) is cls:
+            return data
+        return cls(**data)
+
+    def __getitem__(self, field: str) -> Any:
+        if field in ITEM_FIELDS:
+            return getattr(self, field)
+        if self._extra is not None and field in self._extra:
+            return self._extra[field]
+        raise KeyError(field)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ITEM_FIELDS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(ITEM_FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def __contains__(self, field) -> bool:
+        return field in ITEM_FIELDS or bool(self._extra and field in self._extra)
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        if field in ITEM_FIELDS:
+            setattr(self, field, _intern(field, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[field] = _intern(field, value)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, NewsItem):
+            return (all(getattr(self, field) == getattr(other, field) for field in ITEM_FIELDS)
+                    and (self._extra or {}) == (other._extra or {}))
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'NewsItem({self.to_dict()!r})'
+
+    def __reduce__(self):
+        # Для передачи через parse_pool (pickle)
+        return _restore_item, (tuple(getattr(self, field) for field in ITEM_FIELDS), self._extra)
+
+    def replace(self, **fields) -> 'NewsItem':
+        data = self.to_dict()
+        data.update(fields)
+        return NewsItem(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in ITEM_FIELDS}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+
+def _restore_item(values: Tuple[str, ...], extra: Optional[Dict[str, Any]]) -> NewsItem:
+    return NewsItem(*values, **(extra or {}))
+
+
+class NewsBatch(Sequence):
+
+    def __init__(self, items: Iterable[Mapping] = (), extra_fields: Tuple[str, ...] = ()):
+        self.fields = ITEM_FIELDS + tuple(extra_fields)
+        self._columns: Dict[str, List] = {field: [] for field in self.fields}
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self._columns['link'])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return NewsItem(**{field: self._columns[field][index] for field in self.fields})
+
+    def __setitem__(self, index: int, item: Mapping) -> None:
+        for field in self.fields:
+            self._columns[field][index] = _intern(field, item.get(field, ''))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, NewsBatch):
+            return self.fields == other.fields and self._columns == other._columns
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def append(self, item: Mapping) -> int:
+        for field in self.fields:
+            self._columns[field].append(_intern(field, item.get(field, '')))
+        return len(self) - 1
+
+    def column(self, field: str) -> List:
+        return self._columns[field]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        columns = [self._columns[field] for field in self.fields]
+        return [dict(zip(self.fields, values)) for values in zip(*columns)]
+
+
+def wrap_news(result: Dict[str, List]) -> Dict[str, List]:
+    result['news'] = [NewsItem.from_mapping(item) for item in result['news']]
+    return result
+
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, NewsItem):
+        return value.to_dict()
+    if isinstance(value, NewsBatch):
+        return value.to_dicts()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+"""
+Пул процессов для CPU-ёмкого разбора HTML
+
+Скачивание остаётся в потоках (http_client), а разбор страницы (BeautifulSoup/lxml,
+извлечение карточек и текста) можно отдать в отдельные процессы, чтобы обновление всех
+разделов и их статей упиралось не в один GIL, а в число ядер.
+В воркер передаются сырые байты страницы и кодировка, обратно приходят обычные
+словари news или строки - всё, что переживает pickle.
+
+Число процессов задаётся переменной окружения PARSE_WORKERS или configure();
+0 (по умолчанию) - разбор в текущем процессе, как раньше.
+Функции, которые передаются в run(), должны быть объявлены на уровне модуля.
+Счётчики, которые разбор ведёт в памяти (например, sources.selector_stats), в этом режиме
+накапливаются в процессах пула, а не в основном.
+
+
+!!!! КЛАСС
+
+class ParsePool:   ///   Ленивый пул процессов разбора
+
+
+!!!!  МЕТОД   ///   что делает
+
+run(self, func: Callable, *args) -> Any:   ///   Выполняет func(*args) в пуле (или на месте, если пул выключен) и ждёт результат
+
+shutdown(self) -> None:   ///   Останавливает процессы пула
+
+
+- pool: общий экземпляр ParsePool
+- run(func, *args): то же через общий pool
+- configure(workers): меняет число процессов общего пула
+"""
+
+
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', 0))
+
+# forkserver не копирует потоки и блокировки родителя (фоновое обновление, пулы соединений)
+START_METHOD = os.environ.get('PARSE_START_METHOD',
+                              'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+class ParsePool:
+
+    def __init__(self, workers: int = PARSE_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(START_METHOD),
+                )
+            return self._executor
+
+    def run(self, func: Callable, *args) -> Any:
+        if self.workers <= 0:
+            return func(*args)
+
+        try:
+            return self._get_executor().submit(func, *args).result()
+        except BrokenProcessPool:
+            # Воркер упал - пересоздаём пул при следующем вызове, а эту страницу разбираем здесь
+            self.shutdown()
+            return func(*args)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+pool = ParsePool()
+
+
+def run(func: Callable, *args) -> Any:
+    return pool.run(func, *args)
+
+
+def configure(workers: int) -> None:
+    pool.shutdown()
+    pool.workers = workers
@@ -0,0 +1,108 @@
+import re
+from typing import Iterable, Iterator, List
+
+
+"""
+Превью статьи: первые preview_length символов новости без оглавления
+
+Строки текста читаются лениво: как только набрано достаточно символов, остальное
+не запрашивается. Поэтому extract_preview() можно кормить прямо text_extract.iter_lines(),
+и обход дерева статьи остановится на первых абзацах, а не дойдёт до конца страницы.
+Регулярные выражения оглавления компилируются один раз при импорте.
+
+Превью считаются один раз при сохранении текста статьи (crawler.ingest -> ArticleStore)
+и лежат в базе рядом с текстом, поэтому ленты показывают их без загрузки статей.
+
+
+- is_table_of_contents(text) -> bool: является ли строка оглавлением
+- extract_preview(lines, preview_length=300) -> str: превью из строк текста (итератора или списка)
+- preview_from_text(text, preview_length=300) -> str: то же для готового текста статьи
+"""
+
+
+PREVIEW_LENGTH = 300
+
+# Строки короче не считаются ни оглавлением, ни началом новости
+MIN_LINE_LENGTH = 50
+
+TOC_INDICATORS_RE = re.compile('|'.join(re.escape(indicator) for indicator in (
+    'оглавление', 'содержание', 'содержит', 'в статье',
+    'читайте также', 'table of contents', 'toc',
+    'введение', 'заголовок', 'раздел', 'часть', 'глава'
+)))
+
+# "1. Текст", "II. Текст", "Раздел 1", "Часть 1", "Глава 1"
+TOC_PATTERN_RE = re.compile(r'\d+\.\s|[ivx]+\.\s|раздел\s+\d+|часть\s+\d+|глава\s+\d+')
+
+
+def is_table_of_contents(text: str) -> bool:
+    text_lower = text.lower().strip()
+    if len(text_lower) < MIN_LINE_LENGTH:
+        return False
+
+    if TOC_INDICATORS_RE.search(text_lower):
+        return True
+
+    first_line = text_lower.split('\n', 1)[0]
+    return TOC_PATTERN_RE.match(first_line) is not None
+
+
+def _iter_text_lines(text: str) -> Iterator[str]:
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def _truncate(lines: List[str], preview_length: int) -> str:
+    preview_text = ' '.join(lines)
+
+    # Обрезаем до нужной длины, но не обрезаем середину слова
+    if len(preview_text) > preview_length:
+        preview_text = preview_text[:preview_length]
+        last_space = preview_text.rfind(' ')
+        if last_space > preview_length * 0.7:  # Обрезаем только если есть подходящее место
+            preview_text = preview_text[:last_space]
+        preview_text += '...'
+
+    return preview_text
+
+
+def extract_preview(lines: Iterable[str], preview_length: int = PREVIEW_LENGTH) -> str:
+    news_lines: List[str] = []
+    news_length = -1
+    # Все непустые строки - на случай, если новость так и не началась (нужно не больше preview_length символов)
+    fallback_lines: List[str] = []
+    fallback_length = -1
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if fallback_length <= preview_length:
+            fallback_lines.append(line)
+            fallback_length += len(line) + 1
+
+        if not news_lines:
+            # Пропускаем оглавление и короткие строки до начала новости
+            if len(line) <= MIN_LINE_LENGTH or is_table_of_contents(line):
+                continue
+
+        news_lines.append(line)
+        news_length += len(line) + 1
+        if news_length > preview_length:
+            # Дальше текст в превью уже не попадёт
+            break
+
+    return _truncate(news_lines or fallback_lines, preview_length)
+
+
+def preview_from_text(text: str, preview_length: int = PREVIEW_LENGTH) -> str:
+    if not text:
+        return ''
+    return extract_preview(_iter_text_lines(text), preview_length)
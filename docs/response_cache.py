@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен - отдаём gzip
+    brotli = None
+
+
+"""
+Кэш готовых ответов: отрендеренный HTML вместе со сжатыми копиями и ETag
+
+Страница раздела рендерится и сжимается (gzip и, если установлен brotli, br) один раз
+на версию данных, а не на каждый запрос. Ключ - маршрут, версия - всё, от чего зависит
+страница (номер версии ленты FeedCache.version() и превью карточек). Пока версия та же,
+запрос обходится выбором готовых байтов, а с If-None-Match - ответом 304 без тела.
+
+ETag сильный: хеш отрендеренного тела, у сжатых копий - с суффиксом кодировки
+("...-gzip", "...-br"): сильный валидатор у каждого представления свой (Vary: Accept-Encoding).
+If-None-Match с ETag любого представления той же версии даёт 304.
+Так же кэшируются и не-HTML ответы (ленты JSON/RSS/Atom) - с их content_type.
+
+Настройки: RESPONSE_CACHE_SIZE (число страниц в кэше), GZIP_LEVEL, BROTLI_QUALITY
+
+
+!!!! КЛАССЫ
+
+class CachedResponse:   ///   Тело ответа, его сжатые копии и ETag
+
+class ResponseCache:   ///   Кэш CachedResponse по ключу и версии
+
+
+!!!!  МЕТОД   ///   что делает
+
+CachedResponse.etag(self, encoding: str = 'identity') -> str:   ///   ETag представления в кодировке encoding
+
+CachedResponse.response(self, request) -> Response:   ///   Ответ Flask: 304 по If-None-Match, сжатое тело по Accept-Encoding
+
+ResponseCache.get(self, key: Hashable, version: Hashable, render: Callable[[], str],
+                  content_type: str = HTML) -> CachedResponse:   ///   Готовый ответ для версии или render() и сохранение
+
+ResponseCache.clear(self) -> None:   ///   Сбрасывает кэш
+
+
+- pages: общий экземпляр ResponseCache для страниц разделов
+- exports: общий экземпляр ResponseCache для лент /feed/<раздел>.json|rss|atom
+"""
+
+
+CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 9))
+
+HTML = 'text/html; charset=utf-8'
+
+# Браузер всегда переспрашивает, но получает 304, пока страница не изменилась
+CACHE_CONTROL = 'public, no-cache'
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    accepted = []
+    for part in header.split(','):
+        name, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # q=0 - кодировка запрещена
+        if quality > 0:
+            accepted.append(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == '*':
+        return True
+    # Сравнение для GET - слабое: W/"x" совпадает с "x"
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+class CachedResponse:
+
+    def __init__(self, body: bytes, content_type: str = HTML):
+        self.content_type = content_type
+        self.digest = hashlib.sha1(body).hexdigest()
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def _choose_encoding(self, accept_encoding: str) -> str:
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.bodies and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+    def etag(self, encoding: str = 'identity') -> str:
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+    def response(self, request) -> Response:
+        encoding = self._choose_encoding(request.headers.get('Accept-Encoding', ''))
+        headers = {'ETag': self.etag(encoding), 'Vary': 'Accept-Encoding', 'Cache-Control': CACHE_CONTROL}
+
+        # Тело одно и то же во всех кодировках: подходит ETag любой из них
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and any(_etag_matches(if_none_match, self.etag(name)) for name in self.bodies):
+            return Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(self.bodies[encoding], content_type=self.content_type, headers=headers)
+
+
+class ResponseCache:
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._entries: 'OrderedDict[Hashable, Tuple[Hashable, CachedResponse]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable, version: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get(self, key: Hashable, version: Hashable, render: Callable[[], str],
+            content_type: str = HTML) -> CachedResponse:
+        cached = self._lookup(key, version)
+        if cached is not None:
+            return cached
+
+        # Рендер и сжатие - вне блокировки, чтобы не задерживать другие страницы
+        cached = CachedResponse(render().encode('utf-8'), content_type)
+        with self._lock:
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+pages = ResponseCache()
+exports = ResponseCache()
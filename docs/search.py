@@ -0,0 +1,187 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from news_item import NewsBatch
+from store import ArticleStore
+
+
+"""
+Полнотекстовый поиск по сохранённым статьям (инвертированный индекс в памяти)
+
+Индексируются заголовок и полный текст статей из ArticleStore (тексты, полученные
+через get_full_article_text*). Нормализация слов: нижний регистр, ё -> е и лёгкий
+стемминг русских окончаний, поэтому "выборы", "выборах" и "выборов" находят друг друга.
+Ранжирование - BM25, слова заголовка весят TITLE_WEIGHT раз больше слов текста.
+
+Индекс обновляется инкрементально: sync() забирает из базы только статьи,
+изменённые с прошлой синхронизации, а не строит индекс заново на каждый запрос.
+Карточки проиндексированных статей хранятся по столбцам (news_item.NewsBatch),
+номер статьи в индексе - номер строки; строки удалённых статей используются повторно.
+
+
+!!!! КЛАСС
+
+class SearchIndex:   ///   Инвертированный индекс статей
+
+
+!!!!  МЕТОД   ///   что делает
+
+add(self, link: str, section: str, title: str, text: str = '', **meta) -> None:   ///   Добавляет или переиндексирует статью
+
+remove(self, link: str) -> None:   ///   Убирает статью из индекса
+
+sync(self, store: ArticleStore) -> int:   ///   Добавляет статьи, изменённые в базе с прошлой синхронизации, возвращает их число
+
+search(self, query: str, limit: int = 20, section: Optional[str] = None) -> List[Dict]:   ///   Результаты по убыванию релевантности
+
+
+- tokenize(text) -> List[str]: слова текста после нормализации и стемминга
+- index: общий экземпляр SearchIndex
+"""
+
+
+TITLE_WEIGHT = 3
+
+# Параметры BM25
+K1 = 1.2
+B = 0.75
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Окончания, которые отрезает лёгкий стеммер (длинные проверяются первыми)
+RU_SUFFIXES = sorted([
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ам', 'ям', 'ом', 'ем',
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой',
+    'ую', 'юю', 'ых', 'их', 'ым', 'им',
+    'ешь', 'ишь', 'ете', 'ите', 'ут', 'ют', 'ат', 'ят', 'ет', 'ит', 'ать', 'ять', 'ить', 'еть', 'ть',
+    'ла', 'ло', 'ли', 'ия', 'ие', 'ий', 'ию', 'ии',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+], key=len, reverse=True)
+RU_REFLEXIVE = ('ся', 'сь')
+MIN_STEM = 3
+
+
+def _stem(word: str) -> str:
+    if len(word) <= MIN_STEM or not ('а' <= word[0] <= 'я'):
+        return word
+
+    for suffix in RU_REFLEXIVE:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+
+    for suffix in RU_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower().replace('ё', 'е')
+    return [_stem(word) for word in WORD_RE.findall(text)]
+
+
+class SearchIndex:
+
+    def __init__(self):
+        # слово -> {id статьи: взвешенная частота}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._doc_length: Dict[int, int] = {}
+        self._docs = NewsBatch(extra_fields=('section', 'preview'))
+        self._ids: Dict[str, int] = {}
+        self._free_ids: List[int] = []
+        self._total_length = 0
+        self._cursor = (0.0, '')
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, link: str, section: str, title: str, text: str = '', **meta) -> None:
+        frequencies = Counter(tokenize(text or ''))
+        for term in tokenize(title or ''):
+            frequencies[term] += TITLE_WEIGHT
+
+        with self._lock:
+            self.remove(link)
+
+            row = dict(meta, link=link, section=section, title=title)
+            if self._free_ids:
+                doc_id = self._free_ids.pop()
+                self._docs[doc_id] = row
+            else:
+                doc_id = self._docs.append(row)
+            self._ids[link] = doc_id
+
+            length = sum(frequencies.values())
+            self._doc_length[doc_id] = length
+            self._total_length += length
+            self._doc_terms[doc_id] = list(frequencies)
+            for term, frequency in frequencies.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove(self, link: str) -> None:
+        with self._lock:
+            doc_id = self._ids.pop(link, None)
+            if doc_id is None:
+                return
+
+            for term in self._doc_terms.pop(doc_id):
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._doc_length.pop(doc_id)
+            self._docs[doc_id] = {}
+            self._free_ids.append(doc_id)
+
+    def sync(self, store: ArticleStore) -> int:
+        added = 0
+        with self._lock:
+            while True:
+                rows = store.changed_since(*self._cursor)
+                if not rows:
+                    return added
+
+                for row in rows:
+                    self.add(row['link'], row['section'], row['title'], row['text'] or '',
+                             date=row['date'], time=row['time'], image=row['image'], published=row['published'],
+                             preview=row['preview'] or '')
+                added += len(rows)
+                self._cursor = (rows[-1]['updated_at'], rows[-1]['link'])
+
+    def search(self, query: str, limit: int = 20, section: Optional[str] = None) -> List[Dict]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            total = len(self._ids)
+            if not total:
+                return []
+            average_length = self._total_length / total
+
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = K1 * (1 - B + B * self._doc_length[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+
+            if section:
+                sections = self._docs.column('section')
+                scores = {doc_id: score for doc_id, score in scores.items() if sections[doc_id] == section}
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda pair: pair[1])
+            return [dict(self._docs[doc_id], score=round(score, 4)) for doc_id, score in best]
+
+
+index = SearchIndex()
@@ -0,0 +1,101 @@
+import os
+
+import http_client
+import Parsing_politics_science_health as PSH
+import Parsing_sport_IT_education as SIE
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+
+"""
+Реестр разделов сайта: имя раздела -> (функция парсинга ленты, URL ленты)
+
+- SECTIONS: словарь разделов politics, science, health, sport, it, education
+
+- ARTICLE_TEXT: имя раздела -> функция получения полного текста статьи раздела
+
+- LISTING_SOURCE: имя раздела -> sources.Source его ленты (разметка и схема страниц)
+
+- parse_section(name, url=None): скачивает и парсит ленту раздела name (или её страницу url), возвращает словарь news.
+  Все запросы раздела должны уложиться в SECTION_DEADLINE секунд (см. http_client.deadline)
+  (формат см. в Parsing_politics_science_health.py)
+
+- page_url(name, page, news): адрес страницы page (с 2) ленты раздела по карточкам предыдущей,
+  None если у ленты нет следующих страниц или их схема не подтверждена
+
+- fetch_all_sections(names=None, max_workers=MAX_WORKERS, timeout=None): параллельно скачивает все разделы
+  (или только names) пулом из max_workers потоков, возвращает словарь
+  {'sections': {имя: словарь news}, 'errors': {имя: текст ошибки}}.
+  Разделы, не успевшие за timeout секунд, попадают в errors с текстом 'timeout'
+"""
+
+
+MAX_WORKERS = 6
+SECTION_DEADLINE = float(os.environ.get('SECTION_DEADLINE', 30))
+
+
+SECTIONS = {
+    'politics': (PSH.parse_latest_news_politics, PSH.URL_POLITICS),
+    'science': (PSH.parse_latest_news_science, PSH.URL_SCIENCE),
+    'health': (PSH.parse_latest_news_health, PSH.URL_HEALTH),
+    'sport': (SIE.parse_latest_news_sport, SIE.URL_SPORT),
+    'it': (SIE.parse_latest_news_it, SIE.URL_IT),
+    'education': (SIE.parse_latest_news_education, SIE.URL_EDUCATION),
+}
+
+
+ARTICLE_TEXT = {
+    'politics': PSH.get_full_article_text_politics,
+    'science': PSH.get_full_article_text_science,
+    'health': PSH.get_full_article_text_health,
+    'sport': SIE.get_full_article_text_sport,
+    'it': SIE.get_full_article_text_it,
+    'education': SIE.get_full_article_text_education,
+}
+
+
+LISTING_SOURCE = {
+    'politics': PSH.RIA,
+    'science': PSH.RIA,
+    'health': PSH.RIA,
+    'sport': SIE.SPORT,
+    'it': SIE.IT,
+    'education': SIE.EDUCATION,
+}
+
+
+def parse_section(name: str, url: Optional[str] = None) -> Dict[str, List]:
+    parse_func, section_url = SECTIONS[name]
+    with http_client.deadline(SECTION_DEADLINE):
+        return parse_func(url or section_url)
+
+
+def page_url(name: str, page: int, news: List) -> Optional[str]:
+    _, url = SECTIONS[name]
+    return LISTING_SOURCE[name].page_url(url, page, news)
+
+
+def fetch_all_sections(names: Optional[Iterable[str]] = None,
+                       max_workers: int = MAX_WORKERS,
+                       timeout: Optional[float] = None) -> Dict[str, Dict]:
+    names = list(names) if names is not None else list(SECTIONS)
+    result = {'sections': {}, 'errors': {}}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(parse_section, name): name for name in names}
+    done, not_done = wait(futures, timeout=timeout)
+
+    for future in done:
+        name = futures[future]
+        try:
+            result['sections'][name] = future.result()
+        except Exception as e:
+            result['errors'][name] = f'{type(e).__name__}: {e}'
+
+    for future in not_done:
+        future.cancel()
+        result['errors'][futures[future]] = 'timeout'
+
+    # Не ждём зависшие запросы - они завершатся в фоне
+    executor.shutdown(wait=False)
+    return result
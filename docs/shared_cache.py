@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import news_item
+import singleflight
+
+
+"""
+Общий для всех процессов узла кэш лент разделов (SQLite)
+
+Каждый воркер gunicorn держит свой FeedCache и сам обновлял бы все разделы - N копий
+каждой ленты и N запросов к сайту за интервал. С общим кэшем обновление раздела идёт
+под межпроцессной блокировкой раздела: первый воркер качает ленту и кладёт её сюда,
+остальные, дождавшись блокировки, берут готовую ленту, если она моложе интервала обновления.
+
+Хранилище - одна таблица SQLite в режиме WAL (файл SHARED_CACHE_DB), лента - JSON.
+Другой бэкенд (например, локальный сервер-кэш) подключается объектом с теми же
+методами get / put / lock, переданным в FeedCache(shared=...).
+
+Настройки: SHARED_CACHE (0 - выключить), SHARED_CACHE_DB
+
+
+!!!! КЛАСС
+
+class SharedFeeds:   ///   Ленты разделов, общие для процессов
+
+
+!!!!  МЕТОД   ///   что делает
+
+get(self, name: str, max_age: float) -> Optional[Tuple[Dict[str, List], float]]:   ///   (лента, возраст в секундах), если она моложе max_age, иначе None
+
+put(self, name: str, result: Dict[str, List]) -> None:   ///   Сохраняет ленту раздела
+
+lock(self, name: str):   ///   Межпроцессная блокировка обновления раздела (контекстный менеджер)
+
+clear(self) -> None:   ///   Удаляет все ленты
+
+
+- shared_feeds: общий экземпляр SharedFeeds или None, если SHARED_CACHE=0
+"""
+
+
+SHARED_ENABLED = os.environ.get('SHARED_CACHE', '1') != '0'
+DB_PATH = os.environ.get('SHARED_CACHE_DB',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), '.shared_cache.sqlite3'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS feeds (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+'''
+
+
+class SharedFeeds:
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, name: str, max_age: float) -> Optional[Tuple[Dict[str, List], float]]:
+        row = self._connect().execute('SELECT data, updated_at FROM feeds WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[1]
+        if age > max_age:
+            return None
+        try:
+            result = json.loads(row[0])
+        except ValueError:
+            return None
+        return news_item.wrap_news(result), max(age, 0.0)
+
+    def put(self, name: str, result: Dict[str, List]) -> None:
+        data = json.dumps(result, ensure_ascii=False, default=news_item.to_json)
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO feeds (name, data, updated_at) VALUES (?, ?, ?)',
+                         (name, data, time.time()))
+
+    @contextmanager
+    def lock(self, name: str) -> Iterator[None]:
+        with singleflight.file_lock(f'{self.path}.{name}.lock'):
+            yield
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM feeds')
+
+
+shared_feeds = SharedFeeds() if SHARED_ENABLED else None
@@ -0,0 +1,102 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows - межпроцессной блокировки нет, остаётся объединение внутри процесса
+    fcntl = None
+
+
+"""
+Объединение одинаковых одновременных запросов (single-flight)
+
+Промах кэша на популярной странице под gunicorn с несколькими воркерами и потоками
+порождает N одинаковых запросов к сайту. Здесь два уровня защиты:
+
+- SingleFlight.do(key, func) внутри процесса: первый вызов с ключом выполняет func,
+  остальные одновременные вызовы с тем же ключом ждут и получают его результат
+  (или его исключение). Завершённые вызовы не кэшируются - это делают кэши выше и ниже.
+
+- file_lock(path) между процессами: блокировка файла (fcntl.flock). Кто дождался блокировки,
+  перечитывает общий кэш (дисковый http_cache, shared_cache) - обычно там уже лежит
+  результат процесса, который держал блокировку, и запрос к сайту не нужен.
+
+
+!!!! КЛАСС
+
+class SingleFlight:   ///   Объединение одновременных вызовов с одинаковым ключом
+
+
+!!!!  МЕТОД   ///   что делает
+
+do(self, key: Hashable, func: Callable[[], Any]) -> Any:   ///   Результат func(): свой или уже выполняющегося вызова с тем же ключом
+
+in_flight(self) -> int:   ///   Сколько ключей выполняется сейчас
+
+
+- file_lock(path): контекстный менеджер межпроцессной блокировки файла path (файл создаётся при необходимости)
+- flights: общий экземпляр SingleFlight для парсеров
+"""
+
+
+class _Call:
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+
+    with open(path, 'a+b') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+flights = SingleFlight()
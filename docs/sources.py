@@ -0,0 +1,327 @@
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import soupsieve
+
+import html_parse
+import timestamps
+from news_item import NewsItem
+
+
+"""
+Декларативный реестр источников и общий движок извлечения карточек
+
+Каждый сайт (разделы RIA, Habr, sport.ru, k-obr) описывается объектом Source:
+кодировка, селекторы карточек, поля с цепочками запасных селекторов, правила
+нормализации ссылок и картинок, селекторы контейнера статьи. Все селекторы
+компилируются (soupsieve) один раз при создании Source, а не на каждом select_one в цикле.
+
+Парсеры регистрируют свои источники в SOURCES при импорте
+(см. Parsing_politics_science_health.py и Parsing_sport_IT_education.py),
+а разбор карточек выполняет общий Source.extract_news().
+
+Многостраничные ленты: next_page источника строит адрес следующей страницы
+по адресу первой, номеру страницы и карточкам предыдущей (обход - crawler.ingest).
+Для типовых схем есть query_pages ('?PAGEN_1=2') и path_pages ('.../page2/').
+Схема используется, только если она сверена с настоящими страницами сайта
+(pages_confirmed=True у источника) или источник включён в PAGINATION_SOURCES;
+иначе page_url возвращает None и обход читает одну первую страницу.
+
+Настройки: PAGINATION_SOURCES (имена источников через запятую, чьи схемы страниц включить без сверки)
+
+Цепочка запасных селекторов всегда пробуется в объявленном порядке (побеждает первый
+сработавший). Чтобы не повторять одни и те же промахи на каждой карточке, на время
+extract_news движок запоминает селекторы, которых нет на всей странице: такой селектор
+не найдёт ничего ни в одной её карточке, и first / select его пропускают. Результат
+от этого не меняется и не зависит ни от порядка карточек, ни от истории процесса.
+Счётчики сработавших селекторов:
+- selector_stats.snapshot() -> {источник: {поле: {селектор: число совпадений}}},
+  пустая строка вместо селектора - ни один не подошёл. Счётчики видны в /metrics (selector_hits).
+
+
+!!!! КЛАССЫ
+
+class Source:   ///   Описание сайта и общий движок извлечения
+
+class SelectorStats:   ///   Счётчики сработавших селекторов
+
+class PageMisses:   ///   Селекторы, которых нет на разбираемой странице
+
+
+!!!!  МЕТОД   ///   что делает
+
+Source.first(self, node, field: str) -> Optional[Tag]:   ///   Первый элемент по цепочке селекторов поля
+
+Source.select(self, node, field: str) -> List[Tag]:   ///   Все элементы по первому селектору поля, давшему результат
+
+PageMisses.skip(self, field: str, index: int) -> bool:   ///   True - селектор уже известен как отсутствующий на странице
+
+PageMisses.missed(self, field: str, index: int, pattern) -> None:   ///   Селектор не нашёлся в узле: проверяет его по всей странице (один раз)
+
+Source.find_cards(self, soup) -> List[Tag]:   ///   Карточки новостей на странице ленты
+
+Source.extract_news(self, soup, build=None) -> Dict[str, List]:   ///   Словарь news из страницы ленты (карточки - NewsItem)
+
+Source.find_content(self, soup) -> Optional[Tag]:   ///   Контейнер текста статьи
+
+Source.remove_unwanted(self, node) -> None:   ///   Удаляет из контейнера статьи рекламу, скрипты и т.п.
+
+Source.normalize_url(self, url: str, base: Optional[str]) -> str:   ///   Абсолютный URL по правилам источника
+
+Source.page_url(self, url: str, page: int, news: List[Mapping]) -> Optional[str]:   ///   Адрес страницы page (с 2) ленты url или None,
+    если у источника нет страниц или их схема не подтверждена
+
+
+- SOURCES: зарегистрированные источники, имя -> Source
+- register(source) -> Source: добавляет источник в SOURCES
+- query_pages(param) -> next_page: номер страницы в параметре запроса (url?param=N)
+- path_pages(template) -> next_page: номер страницы в пути (url + template.format(page=N))
+- selector_stats: общий экземпляр SelectorStats
+"""
+
+
+PAGINATION_SOURCES = {name.strip() for name in os.environ.get('PAGINATION_SOURCES', '').split(',') if name.strip()}
+
+
+class SelectorStats:
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, source: str, field: str, selector: str) -> None:
+        with self._lock:
+            self._counts[(source, field, selector)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        with self._lock:
+            counts = dict(self._counts)
+
+        result: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for (source, field, selector), count in counts.items():
+            result.setdefault(source, {}).setdefault(field, {})[selector] = count
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+selector_stats = SelectorStats()
+
+
+class PageMisses:
+
+    def __init__(self, page):
+        self.page = page
+        self._checked = set()
+        self._absent = set()
+
+    def skip(self, field: str, index: int) -> bool:
+        return (field, index) in self._absent
+
+    def missed(self, field: str, index: int, pattern) -> None:
+        key = (field, index)
+        if key in self._checked:
+            return
+        self._checked.add(key)
+        # Промах в одной карточке ничего не говорит о других - пропускать можно только то, чего нет на всей странице
+        if pattern.select_one(self.page) is None:
+            self._absent.add(key)
+
+
+class Source:
+
+    def __init__(self,
+                 name: str,
+                 encoding: str = 'utf-8',
+                 cards: Sequence[str] = (),
+                 item: Optional[str] = None,
+                 fields: Optional[Dict[str, Sequence[str]]] = None,
+                 build: Optional[Callable] = None,
+                 link_base: Optional[str] = None,
+                 image_base: Optional[str] = None,
+                 content: Sequence[str] = (),
+                 unwanted: Sequence[str] = (),
+                 dedup_links: bool = False,
+                 skip_errors: bool = False,
+                 next_page: Optional[Callable[[str, int, List[Mapping]], Optional[str]]] = None,
+                 pages_confirmed: bool = False):
+        self.name = name
+        self.encoding = encoding
+        self.build = build
+        self.link_base = link_base
+        self.image_base = image_base
+        self.dedup_links = dedup_links
+        self.skip_errors = skip_errors
+        self.next_page = next_page
+        self.pages_confirmed = pages_confirmed
+
+        # Карточки: результаты всех селекторов складываются по порядку
+        self.card_selectors = list(cards)
+        self._cards = [soupsieve.compile(s) for s in self.card_selectors]
+        self._item = soupsieve.compile(item) if item else None
+        self.strainer = html_parse.CardStrainer(
+            part.strip() for selector in self.card_selectors for part in selector.split(','))
+
+        # Поля: цепочка запасных селекторов, побеждает первый сработавший
+        self._fields = {
+            field: [(s, soupsieve.compile(s)) for s in selectors]
+            for field, selectors in (fields or {}).items()
+        }
+        self.content_selectors = list(content)
+        # PageMisses страницы, которую сейчас разбирает extract_news в этом потоке
+        self._page = threading.local()
+        self._content = [(s, soupsieve.compile(s)) for s in self.content_selectors]
+        self._unwanted = soupsieve.compile(', '.join(unwanted)) if unwanted else None
+
+    def _chain(self, field: str) -> Iterable:
+        misses = getattr(self._page, 'misses', None)
+        for i, (selector, pattern) in enumerate(self._fields[field]):
+            if misses is None or not misses.skip(field, i):
+                yield i, selector, pattern
+
+    def _missed(self, field: str, index: int, pattern) -> None:
+        misses = getattr(self._page, 'misses', None)
+        if misses is not None:
+            misses.missed(field, index, pattern)
+
+    def first(self, node, field: str):
+        for i, selector, pattern in self._chain(field):
+            found = pattern.select_one(node)
+            if found is not None:
+                selector_stats.record(self.name, field, selector)
+                return found
+            self._missed(field, i, pattern)
+
+        selector_stats.record(self.name, field, '')
+        return None
+
+    def select(self, node, field: str) -> List:
+        for i, selector, pattern in self._chain(field):
+            found = pattern.select(node)
+            if found:
+                selector_stats.record(self.name, field, selector)
+                return found
+            self._missed(field, i, pattern)
+
+        selector_stats.record(self.name, field, '')
+        return []
+
+    def find_cards(self, soup) -> List:
+        cards = []
+        for pattern in self._cards:
+            cards.extend(pattern.select(soup))
+
+        if self._item is None:
+            return cards
+
+        # Карточка лежит внутри обёртки - берём первую внутри каждой
+        items = []
+        for wrapper in cards:
+            item = self._item.select_one(wrapper)
+            if item is not None:
+                items.append(item)
+        return items
+
+    def normalize_url(self, url: str, base: Optional[str]) -> str:
+        if not url:
+            return url
+        if url.startswith('//'):
+            return 'https:' + url
+        if url.startswith('/') and base:
+            return base + url
+        return url
+
+    def page_url(self, url: str, page: int, news: List[Mapping]) -> Optional[str]:
+        if self.next_page is None:
+            return None
+        # Непроверенная схема дала бы 404 или чужую ленту - лучше одна страница
+        if not (self.pages_confirmed or self.name in PAGINATION_SOURCES):
+            return None
+        return self.next_page(url, page, news)
+
+    def extract_news(self, soup, build: Optional[Callable] = None) -> Dict[str, List]:
+        build = build or self.build
+        news_dict = {'news': []}
+        # Относительные даты ('Сегодня', '10 октября' без года) считаются от момента разбора
+        now = datetime.now(timestamps.MOSCOW)
+
+        self._page.misses = PageMisses(soup)
+        try:
+            news_dict['news'] = self._extract_cards(soup, build, now)
+        finally:
+            self._page.misses = None
+        return news_dict
+
+    def _extract_cards(self, soup, build: Callable, now: datetime) -> List:
+        cards = []
+        seen_links = set()
+        for card in self.find_cards(soup):
+            try:
+                news = build(card)
+            except Exception:
+                if self.skip_errors:
+                    continue
+                raise
+            if not news:
+                continue
+
+            news['link'] = self.normalize_url(news['link'], self.link_base)
+            news['image'] = self.normalize_url(news['image'], self.image_base)
+            if not news.get('published'):
+                news['published'] = timestamps.normalize(news.get('date', ''), news.get('time', ''), now)
+
+            if self.dedup_links:
+                if news['link'] in seen_links:
+                    continue
+                seen_links.add(news['link'])
+
+            cards.append(NewsItem.from_mapping(news))
+        return cards
+
+    def iter_content(self, soup) -> Iterable:
+        for selector, pattern in self._content:
+            found = pattern.select_one(soup)
+            if found is not None:
+                selector_stats.record(self.name, 'content', selector)
+                yield found
+
+    def find_content(self, soup):
+        for found in self.iter_content(soup):
+            return found
+        selector_stats.record(self.name, 'content', '')
+        return None
+
+    def remove_unwanted(self, node) -> None:
+        if self._unwanted is None:
+            return
+        for elem in self._unwanted.select(node):
+            elem.decompose()
+
+
+SOURCES: Dict[str, Source] = {}
+
+
+def register(source: Source) -> Source:
+    SOURCES[source.name] = source
+    return source
+
+
+def query_pages(param: str) -> Callable[[str, int, List[Mapping]], str]:
+    def next_page(url: str, page: int, news: List[Mapping]) -> str:
+        parts = urlsplit(url)
+        query = [(key, value) for key, value in parse_qsl(parts.query) if key != param]
+        query.append((param, str(page)))
+        return urlunsplit(parts._replace(path=parts.path or '/', query=urlencode(query)))
+    return next_page
+
+
+def path_pages(template: str) -> Callable[[str, int, List[Mapping]], str]:
+    def next_page(url: str, page: int, news: List[Mapping]) -> str:
+        return url.rstrip('/') + '/' + template.format(page=page)
+    return next_page
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from news_item import ITEM_FIELDS, NewsItem
+
+
+"""
+Хранилище статей в SQLite
+
+Ключ - ссылка на статью. Для каждой статьи хранятся заголовок, дата, время, картинка,
+нормализованное время публикации (published, см. timestamps.py), раздел, полный текст, превью и время загрузки текста. Нужно для инкрементального обхода
+(crawler.py): полный текст качается только для ссылок, которых ещё нет в базе,
+а после перезапуска ленты сразу поднимаются из базы.
+
+Путь к базе: переменная окружения ARTICLE_DB (по умолчанию docs/articles.sqlite3).
+Соединения открываются по одному на поток.
+
+
+!!!! КЛАСС
+
+class ArticleStore:   ///   Хранилище статей
+
+
+!!!!  МЕТОД   ///   что делает
+
+add_cards(self, section: str, news: List[Dict]) -> int:   ///   Добавляет карточки из ленты, возвращает число новых
+
+known_links(self, links: Iterable[str]) -> Set[str]:   ///   Какие из ссылок уже есть в базе
+
+links_without_text(self, links: Iterable[str]) -> List[str]:   ///   Ссылки, для которых ещё нет полного текста (с учётом числа попыток)
+
+save_text(self, link: str, text: str, preview: str = '') -> None:   ///   Сохраняет полный текст и превью (пустой текст считается неудачной попыткой)
+
+copy_text(self, link: str, source: str) -> bool:   ///   Дубль сюжета: текст и превью берутся у source (если он уже скачан),
+    попытка засчитывается в любом случае - links_without_text больше не вернёт link
+
+previews(self, links: Iterable[str]) -> Dict[str, str]:   ///   Готовые превью для ссылок, у которых они есть
+
+get(self, link: str) -> Optional[Dict]:   ///   Статья по ссылке
+
+latest_news(self, section: str, limit: int = 50) -> Dict[str, List]:   ///   Последние карточки раздела в формате {'news': [...]}
+
+changed_since(self, timestamp: float, after_link: str = '', limit: int = 1000) -> List[Dict]:   ///   Статьи, изменённые после курсора (timestamp, after_link), по возрастанию updated_at
+
+count(self, section: Optional[str] = None) -> int:   ///   Число статей (в разделе)
+
+
+- store: общий экземпляр ArticleStore
+"""
+
+
+DB_PATH = os.environ.get('ARTICLE_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'articles.sqlite3'))
+
+# Сколько раз пытаться скачать текст статьи, прежде чем перестать
+MAX_TEXT_ATTEMPTS = 3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS articles (
+    link TEXT PRIMARY KEY,
+    section TEXT NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL DEFAULT '',
+    image TEXT NOT NULL DEFAULT '',
+    published TEXT NOT NULL DEFAULT '',
+    text TEXT,
+    preview TEXT,
+    fetched_at REAL,
+    text_attempts INTEGER NOT NULL DEFAULT 0,
+    added_at REAL NOT NULL,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS articles_section_added ON articles (section, added_at);
+'''
+
+# Столбцы, добавленные после первой версии схемы: имя -> определение
+ADDED_COLUMNS = {
+    'updated_at': 'REAL NOT NULL DEFAULT 0',
+    'preview': 'TEXT',
+    'published': "TEXT NOT NULL DEFAULT ''",
+}
+
+
+class ArticleStore:
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Базы, созданные до появления новых столбцов
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(articles)')}
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE articles ADD COLUMN {column} {definition}')
+            conn.execute('CREATE INDEX IF NOT EXISTS articles_updated ON articles (updated_at, link)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL: читатели не блокируют писателя (несколько потоков и процессов)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add_cards(self, section: str, news: List[Dict]) -> int:
+        now = time.time()
+        rows = []
+        # Карточки в ленте идут от новых к старым - сохраняем порядок через added_at
+        for i, item in enumerate(news):
+            if not item.get('link'):
+                continue
+            added_at = now - i * 1e-6
+            rows.append((item['link'], section, item.get('title', ''), item.get('date', ''),
+                         item.get('time', ''), item.get('image', ''), item.get('published', ''), added_at, now))
+
+        conn = self._connect()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO articles (link, section, title, date, time, image, published, added_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            return conn.total_changes - before
+
+    def known_links(self, links: Iterable[str]) -> Set[str]:
+        links = list(links)
+        known = set()
+        conn = self._connect()
+        # Ограничение SQLite на число параметров в запросе
+        for start in range(0, len(links), 500):
+            chunk = links[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f'SELECT link FROM articles WHERE link IN ({placeholders})', chunk)
+            known.update(row['link'] for row in rows)
+        return known
+
+    def links_without_text(self, links: Iterable[str]) -> List[str]:
+        links = list(links)
+        missing = set()
+        conn = self._connect()
+        for start in range(0, len(links), 500):
+            chunk = links[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT link FROM articles WHERE link IN ({placeholders}) '
+                f'AND text IS NULL AND text_attempts < ?', chunk + [MAX_TEXT_ATTEMPTS])
+            missing.update(row['link'] for row in rows)
+        return [link for link in links if link in missing]
+
+    def save_text(self, link: str, text: str, preview: str = '') -> None:
+        conn = self._connect()
+        with conn:
+            if text:
+                now = time.time()
+                conn.execute('UPDATE articles SET text = ?, preview = ?, fetched_at = ?, updated_at = ?, '
+                             'text_attempts = text_attempts + 1 WHERE link = ?', (text, preview, now, now, link))
+            else:
+                conn.execute('UPDATE articles SET text_attempts = text_attempts + 1 WHERE link = ?', (link,))
+
+    def copy_text(self, link: str, source: str) -> bool:
+        conn = self._connect()
+        with conn:
+            row = conn.execute('SELECT text, preview FROM articles WHERE link = ? AND text IS NOT NULL',
+                               (source,)).fetchone()
+            if row is None:
+                conn.execute('UPDATE articles SET text_attempts = text_attempts + 1 WHERE link = ?', (link,))
+                return False
+            now = time.time()
+            conn.execute('UPDATE articles SET text = ?, preview = ?, fetched_at = ?, updated_at = ?, '
+                         'text_attempts = text_attempts + 1 WHERE link = ?',
+                         (row['text'], row['preview'], now, now, link))
+            return True
+
+    def previews(self, links: Iterable[str]) -> Dict[str, str]:
+        links = list(links)
+        result = {}
+        conn = self._connect()
+        for start in range(0, len(links), 500):
+            chunk = links[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT link, preview FROM articles WHERE link IN ({placeholders}) AND preview != \'\'', chunk)
+            result.update((row['link'], row['preview']) for row in rows)
+        return result
+
+    def get(self, link: str) -> Optional[Dict]:
+        row = self._connect().execute('SELECT * FROM articles WHERE link = ?', (link,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_news(self, section: str, limit: int = 50) -> Dict[str, List]:
+        rows = self._connect().execute(
+            'SELECT title, date, time, image, link, published FROM articles WHERE section = ? '
+            'ORDER BY added_at DESC LIMIT ?', (section, limit))
+        return {'news': [NewsItem(*(row[field] for field in ITEM_FIELDS)) for row in rows]}
+
+    def changed_since(self, timestamp: float, after_link: str = '', limit: int = 1000) -> List[Dict]:
+        # Постраничный курсор (updated_at, link): у многих строк одинаковый updated_at
+        rows = self._connect().execute(
+            'SELECT link, section, title, date, time, image, published, text, preview, updated_at FROM articles '
+            'WHERE updated_at > ? OR (updated_at = ? AND link > ?) '
+            'ORDER BY updated_at, link LIMIT ?', (timestamp, timestamp, after_link, limit))
+        return [dict(row) for row in rows]
+
+    def count(self, section: Optional[str] = None) -> int:
+        if section is None:
+            row = self._connect().execute('SELECT COUNT(*) FROM articles').fetchone()
+        else:
+            row = self._connect().execute('SELECT COUNT(*) FROM articles WHERE section = ?', (section,)).fetchone()
+        return row[0]
+
+
+store = ArticleStore()
@@ -0,0 +1,122 @@
+import os
+from typing import Hashable, Optional, Sequence
+
+from lxml import etree
+
+import html_parse
+
+
+"""
+Потоковая загрузка страниц статей с ранним обрывом
+
+Для текста статьи нужен только контейнер (div.article__body, .article-formatted-body,
+div.article-text, ...), а всё после него - комментарии, "читайте также", подвал, скрипты -
+качать и разбирать незачем. ContainerStop получает тело ответа кусками (байты, без
+декодирования в str) и скармливает их инкрементальному парсеру lxml (HTMLPullParser).
+Как только закрылся контейнер (и внутри него есть текст), HttpClient обрывает чтение ответа.
+Для превью достаточно первых символов текста: с text_budget чтение обрывается,
+когда внутри контейнера набралось столько символов.
+
+Прочитанное начало страницы содержит контейнер целиком, поэтому обычный разбор
+(Source.find_content и извлечение текста) даёт тот же результат, что и по всей странице.
+Такое начало можно хранить в дисковом кэше (cacheable); обрыв по text_budget -
+нельзя: контейнер в нём неполный.
+
+Контейнер ищется по первому (основному) селектору content источника; из составных
+селекторов берётся последняя часть ('#post-content-body .article-formatted-body' ->
+'.article-formatted-body'). Если страница устроена иначе, она читается целиком.
+
+Настройки: STREAM_ARTICLES (0 - всегда качать страницу целиком)
+
+
+!!!! КЛАСС
+
+class ContainerStop:   ///   Инкрементальный разбор тела ответа до закрытия контейнера статьи
+
+
+!!!!  МЕТОД   ///   что делает
+
+feed(self, chunk: bytes) -> bool:   ///   Разбирает очередной кусок, True - дальше читать не нужно
+
+key   ///   Ключ для объединения одинаковых запросов (singleflight): страницы, оборванные по-разному, не смешиваются
+
+cacheable   ///   Можно ли сохранить прочитанное начало страницы в дисковый кэш
+
+
+- PREVIEW_FACTOR: во сколько раз text_budget для превью больше его длины
+- container_stop(source, text_budget=0) -> Optional[ContainerStop]: ContainerStop для контейнера статьи
+  источника (sources.Source) или None, если потоковый режим выключен или селектор не поддерживается
+"""
+
+
+ENABLED = os.environ.get('STREAM_ARTICLES', '1') != '0'
+
+# Превью: text_budget = длина превью * PREVIEW_FACTOR (запас на пропущенное оглавление и короткие строки)
+PREVIEW_FACTOR = 4
+
+
+def _last_compound(selector: str) -> str:
+    return selector.strip().split()[-1] if selector.strip() else ''
+
+
+class ContainerStop:
+
+    def __init__(self, selectors: Sequence[str], encoding: str = 'utf-8', text_budget: int = 0):
+        self.selectors = [_last_compound(part) for selector in selectors for part in selector.split(',')]
+        self.rules = html_parse.compile_selectors(s for s in self.selectors if s)
+        self.encoding = encoding
+        self.text_budget = text_budget
+        self.cacheable = False
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        self._open = 0
+        self._text = 0
+        self._done = False
+
+    @property
+    def key(self) -> Hashable:
+        return tuple(self.selectors), self.text_budget
+
+    def _matches(self, element) -> bool:
+        return isinstance(element.tag, str) and html_parse.matches(self.rules, element.tag, element.attrib)
+
+    def feed(self, chunk: bytes) -> bool:
+        if self._done:
+            return True
+        try:
+            self._parser.feed(chunk)
+            events = list(self._parser.read_events())
+        except (etree.LxmlError, ValueError):
+            # Не смогли разобрать - читаем страницу целиком, как без потокового режима
+            self._done = False
+            return False
+
+        for event, element in events:
+            matched = self._matches(element)
+            if event == 'start':
+                if matched:
+                    self._open += 1
+                continue
+
+            if self._open and self.text_budget:
+                self._text += len((element.text or '').strip())
+                if self._text >= self.text_budget:
+                    self._done = True
+                    return True
+
+            if matched:
+                self._open -= 1
+                # Закрылся внешний контейнер с текстом - всё нужное уже прочитано
+                if self._open == 0 and ''.join(element.itertext()).strip():
+                    self._done = True
+                    self.cacheable = True
+                    return True
+        return False
+
+
+def container_stop(source, text_budget: int = 0) -> Optional[ContainerStop]:
+    if not ENABLED or not source.content_selectors:
+        return None
+    try:
+        return ContainerStop(source.content_selectors[:1], source.encoding, text_budget)
+    except ValueError:
+        return None
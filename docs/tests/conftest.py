@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Модули приложения лежат в docs/ плоско и импортируются по имени, как в main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Тесты не трогают рабочую базу статей и кэши
+os.environ.setdefault('ARTICLE_DB', os.path.join(tempfile.mkdtemp(), 'articles.sqlite3'))
+os.environ.setdefault('HTTP_CACHE', '0')
@@ -0,0 +1,50 @@
+from dedup import NearDuplicateIndex
+
+
+TITLE = 'Правительство утвердило новые правила выдачи льготной ипотеки для семей с детьми'
+
+
+def test_reworded_copy_joins_the_first_story():
+    index = NearDuplicateIndex()
+    assert index.add('https://ria.ru/1', TITLE, section='politics') == 'https://ria.ru/1'
+    # Тот же сюжет в другом разделе с хвостом в заголовке
+    canonical = index.add('https://ria.ru/2', TITLE + ' - подробности', section='politics')
+    assert canonical == 'https://ria.ru/1'
+    assert index.is_duplicate('https://ria.ru/2')
+    assert sorted(index.cluster('https://ria.ru/1')) == ['https://ria.ru/1', 'https://ria.ru/2']
+
+
+def test_titles_differing_in_one_name_stay_apart_once_texts_differ():
+    index = NearDuplicateIndex()
+    index.add('https://ria.ru/erdogan', 'Путин провел телефонный разговор с Эрдоганом',
+              'Стороны обсудили поставки газа через Турцию и ситуацию в Сирии', 'politics')
+    canonical = index.add('https://ria.ru/aliev', 'Путин провел телефонный разговор с Алиевым',
+                          'Президенты обсудили транспортный коридор и делимитацию границы', 'politics')
+    assert canonical == 'https://ria.ru/aliev'
+    assert not index.is_duplicate('https://ria.ru/aliev')
+
+
+def test_unrelated_stories_are_unique():
+    index = NearDuplicateIndex()
+    links = {
+        'https://ria.ru/a': 'Центробанк сохранил ключевую ставку на прежнем уровне',
+        'https://habr.com/b': 'Вышла новая версия языка программирования Python',
+        'https://sport.ru/c': 'Сборная выиграла товарищеский матч со счетом два один',
+    }
+    for link, title in links.items():
+        assert index.add(link, title) == link
+
+
+def test_same_title_far_apart_in_time_is_a_new_story():
+    index = NearDuplicateIndex()
+    index.add('https://ria.ru/old', TITLE, published='2025-01-10T10:00:00+03:00')
+    canonical = index.add('https://ria.ru/new', TITLE, published='2025-03-10T10:00:00+03:00')
+    assert canonical == 'https://ria.ru/new'
+
+
+def test_short_titles_are_not_grouped():
+    index = NearDuplicateIndex()
+    # Меньше MIN_SHINGLES шинглов: такие заголовки совпадают у разных новостей
+    index.add('https://ria.ru/x', 'Итоги дня')
+    assert index.add('https://ria.ru/y', 'Итоги дня') == 'https://ria.ru/y'
+    assert 'https://ria.ru/y' not in index
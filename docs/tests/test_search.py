@@ -0,0 +1,44 @@
+from search import SearchIndex, tokenize
+
+
+def _index():
+    index = SearchIndex()
+    index.add('https://ria.ru/budget', 'politics', 'Госдума приняла бюджет',
+              'Депутаты приняли бюджет на три года. Расходы бюджета на медицину выросли.')
+    index.add('https://ria.ru/elections', 'politics', 'Выборы губернатора',
+              'На выборах губернатора явка составила сорок процентов. Бюджет кампании не раскрывается.')
+    index.add('https://habr.com/python', 'it', 'Вышел Python 3.13',
+              'В новой версии ускорили интерпретатор и улучшили сообщения об ошибках.')
+    return index
+
+
+def _links(results):
+    return [result['link'] for result in results]
+
+
+def test_word_forms_match_the_same_stem():
+    assert tokenize('выборы') == tokenize('выборах') == tokenize('выборов')
+    assert _links(_index().search('выборов')) == ['https://ria.ru/elections']
+
+
+def test_title_match_outranks_a_passing_mention():
+    # "бюджет" - в заголовке и трижды в тексте первой статьи, во второй - одно упоминание в тексте
+    assert _links(_index().search('бюджет')) == ['https://ria.ru/budget', 'https://ria.ru/elections']
+
+
+def test_rare_term_decides_the_ranking():
+    # Оба слова есть в первой статье, но "явка" встречается только во второй: у неё больший IDF
+    results = _index().search('бюджет явка')
+    assert _links(results)[0] == 'https://ria.ru/elections'
+
+
+def test_section_filter_and_limit():
+    index = _index()
+    assert _links(index.search('бюджет', section='it')) == []
+    assert len(index.search('бюджет', limit=1)) == 1
+
+
+def test_removed_article_is_not_found():
+    index = _index()
+    index.remove('https://ria.ru/budget')
+    assert _links(index.search('бюджет')) == ['https://ria.ru/elections']
@@ -0,0 +1,151 @@
+from typing import Iterator, List, Tuple
+
+from bs4 import CData, NavigableString, Tag
+
+
+"""
+Однопроходное извлечение текста статьи с сохранением переносов строк
+
+Заменяет старую схему NewsParser._extract_formatted_text (prettify() -> повторный разбор lxml ->
+пять проходов find_all): дерево обходится один раз явным стеком, каждый текстовый узел
+выдаётся отдельной строкой, поэтому абзацы, заголовки, пункты списков и блоки
+оказываются на своих строках. Содержимое <pre>/<textarea> склеивается, как и раньше,
+с переносами только вокруг заголовков, абзацев, списков и листовых div.
+Результат совпадает с get_full_article_text(preserve_formatting=True).
+
+Принимает как узел BeautifulSoup (Tag), так и элемент lxml (например, из потокового разбора).
+
+
+- formatted_text(root) -> str: текст узла, по строке на текстовый фрагмент, без пустых строк
+
+- iter_lines(root) -> Iterator[str]: те же строки по одной, без сборки всего текста
+"""
+
+
+SKIP_TAGS = {'script', 'style'}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+LIST_TAGS = {'ul', 'ol'}
+BLOCK_TAGS = HEADING_TAGS | LIST_TAGS | {'p'}
+
+# Комментарии, doctype и прочие служебные строки bs4 в текст не попадают
+TEXT_TYPES = (NavigableString, CData)
+
+# События обхода: (TEXT, строка), (START, тег), (END, тег)
+TEXT, START, END = 0, 1, 2
+
+
+def _soup_events(root: Tag) -> Iterator[Tuple[int, str]]:
+    stack = list(reversed(root.contents))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if node.name in SKIP_TAGS:
+                continue
+            yield START, node.name
+            stack.append((END, node.name))
+            stack.extend(reversed(node.contents))
+        elif isinstance(node, tuple):
+            yield node
+        elif type(node) in TEXT_TYPES:
+            yield TEXT, node
+
+
+def _lxml_events(root) -> Iterator[Tuple[int, str]]:
+    # В стеке лежат элементы, их хвосты (tail) и закрывающие события в порядке документа
+    if root.text:
+        yield TEXT, root.text
+    stack = []
+    for child in reversed(root):
+        if child.tail:
+            stack.append((TEXT, child.tail))
+        stack.append(child)
+
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            yield node
+            continue
+
+        tag = node.tag
+        # Комментарий или инструкция обработки - текст пропускаем, хвост уже в стеке
+        if not isinstance(tag, str) or tag in SKIP_TAGS:
+            continue
+
+        yield START, tag
+        if node.text:
+            yield TEXT, node.text
+        stack.append((END, tag))
+        for child in reversed(node):
+            if child.tail:
+                stack.append((TEXT, child.tail))
+            stack.append(child)
+
+
+def _split_lines(text: str) -> Iterator[str]:
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_lines(root) -> Iterator[str]:
+    events = _soup_events(root) if isinstance(root, Tag) else _lxml_events(root)
+
+    pre_depth = 0
+    list_depth = 0
+    pre_buffer: List[str] = []
+    # Для каждого открытого div внутри <pre>: [есть ли текст, есть ли блочные потомки]
+    div_frames: List[List[bool]] = []
+
+    for kind, value in events:
+        if kind == TEXT:
+            if not pre_depth:
+                # Вне <pre> каждый текстовый фрагмент - отдельная строка
+                yield from _split_lines(value)
+                continue
+            pre_buffer.append(value)
+            if div_frames and value.strip():
+                for frame in div_frames:
+                    frame[0] = True
+            continue
+
+        if value in PRESERVE_WHITESPACE_TAGS:
+            if kind == START:
+                pre_depth += 1
+            else:
+                pre_depth -= 1
+                if not pre_depth:
+                    yield from _split_lines(''.join(pre_buffer))
+                    pre_buffer = []
+            continue
+
+        if value in LIST_TAGS:
+            list_depth += 1 if kind == START else -1
+
+        if not pre_depth:
+            continue
+
+        # Внутри <pre> текст склеивается, переносы ставятся только вокруг блоков
+        if kind == START:
+            if value in HEADING_TAGS:
+                pre_buffer.append('\n')
+            if value in BLOCK_TAGS:
+                for frame in div_frames:
+                    frame[1] = True
+            if value == 'div':
+                div_frames.append([False, False])
+        else:
+            if value in BLOCK_TAGS or (value == 'li' and list_depth):
+                pre_buffer.append('\n')
+            elif value == 'div' and div_frames:
+                has_text, has_blocks = div_frames.pop()
+                if has_text and not has_blocks:
+                    pre_buffer.append('\n')
+
+    if pre_buffer:
+        yield from _split_lines(''.join(pre_buffer))
+
+
+def formatted_text(root) -> str:
+    return '\n'.join(iter_lines(root))
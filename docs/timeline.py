@@ -0,0 +1,128 @@
+import base64
+import bisect
+import heapq
+import json
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import sections
+from dedup import stories
+from feed_cache import FeedCache, feeds
+from news_item import NewsItem
+
+
+"""
+Общая лента "последнее во всех разделах" с постраничной выдачей по курсору
+
+Каждая лента раздела один раз на свою версию (FeedCache.version()) сортируется
+по ключу (published, link) и хранится вместе с отсортированным списком ключей.
+Страница общей ленты - k-way merge (heapq.merge) этих уже отсортированных лент
+от новых к старым: на запрос уходит O(limit * log k), а не сортировка всех карточек.
+
+Курсор - ключ последней отданной карточки (непрозрачная строка base64 для URL).
+Следующая страница начинается строго после него: bisect в каждой ленте
+находит место продолжения, поэтому новые карточки, появившиеся между запросами,
+не сдвигают страницы и не дают повторов. Неразборчивый курсор - выдача с начала.
+
+Карточки без времени публикации (published == '') идут в конце ленты.
+Одна и та же ссылка в нескольких разделах и почти одинаковые новости
+(один сюжет по dedup.stories) отдаются на странице один раз - самая свежая.
+
+
+!!!! КЛАСС
+
+class Timeline:   ///   Слияние лент разделов в одну ленту по времени публикации
+
+
+!!!!  МЕТОД   ///   что делает
+
+page(self, limit: int = PAGE_SIZE, cursor: str = '') -> Tuple[List[NewsItem], str]:   ///   Страница общей ленты и курсор следующей ('' - страниц больше нет)
+
+version(self) -> Tuple[int, ...]:   ///   Версии всех лент: общая лента изменилась, если изменилась любая из них
+
+
+- encode_cursor(key) -> str, decode_cursor(cursor) -> Optional[Tuple[str, str]]: курсор <-> ключ (published, link)
+- timeline: общий экземпляр Timeline над feeds и всеми разделами sections.SECTIONS
+"""
+
+
+PAGE_SIZE = 30
+MAX_PAGE_SIZE = 200
+
+Key = Tuple[str, str]
+
+
+def _key(item: NewsItem) -> Key:
+    return item['published'], item['link']
+
+
+def encode_cursor(key: Key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key), ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Optional[Key]:
+    try:
+        published, link = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        return None
+    if not (isinstance(published, str) and isinstance(link, str)):
+        return None
+    return published, link
+
+
+class Timeline:
+
+    def __init__(self, feeds: FeedCache, names: Iterable[str]):
+        self.feeds = feeds
+        self.names = list(names)
+        # раздел -> (версия ленты, ключи по возрастанию, карточки в том же порядке)
+        self._sorted: Dict[str, Tuple[int, List[Key], List[NewsItem]]] = {}
+        self._lock = threading.Lock()
+
+    def version(self) -> Tuple[int, ...]:
+        return tuple(self.feeds.version(name) for name in self.names)
+
+    def _section(self, name: str) -> Tuple[List[Key], List[NewsItem]]:
+        version, result = self.feeds.snapshot(name)
+        news = result['news']
+        entry = self._sorted.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+
+        items = sorted((NewsItem.from_mapping(item).replace(section=name) for item in news if item.get('link')),
+                       key=_key)
+        keys = [_key(item) for item in items]
+        with self._lock:
+            self._sorted[name] = (version, keys, items)
+        return keys, items
+
+    def _newest_first(self, name: str, before: Optional[Key]) -> Iterator[NewsItem]:
+        keys, items = self._section(name)
+        end = bisect.bisect_left(keys, before) if before is not None else len(keys)
+        for i in range(end - 1, -1, -1):
+            yield items[i]
+
+    def page(self, limit: int = PAGE_SIZE, cursor: str = '') -> Tuple[List[NewsItem], str]:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        before = decode_cursor(cursor) if cursor else None
+
+        merged = heapq.merge(*(self._newest_first(name, before) for name in self.names), key=_key, reverse=True)
+        result = []
+        seen_stories = set()
+        for item in merged:
+            story = stories.canonical(item['link'])
+            if story in seen_stories:
+                continue
+            seen_stories.add(story)
+            result.append(item)
+            if len(result) > limit:
+                break
+
+        # Взяли на одну карточку больше, чтобы знать, есть ли следующая страница
+        if len(result) > limit:
+            result = result[:limit]
+            return result, encode_cursor(_key(result[-1]))
+        return result, ''
+
+
+timeline = Timeline(feeds, sections.SECTIONS)
@@ -0,0 +1,107 @@
+import re
+from datetime import date as Date, datetime, timedelta, timezone, tzinfo
+from typing import Optional
+
+try:
+    from zoneinfo import ZoneInfo
+    MOSCOW: tzinfo = ZoneInfo('Europe/Moscow')
+except Exception:  # нет базы часовых поясов (tzdata) - Москва без перехода на летнее время
+    MOSCOW = timezone(timedelta(hours=3), 'MSK')
+
+
+"""
+Нормализация дат и времени карточек в одно время публикации с часовым поясом
+
+Источники отдают дату по-разному: RIA - 'Сегодня' или '10 октября' и 'ЧЧ:ММ',
+k-obr - 'ДД.ММ.ГГГГ', Habr - 'ГГГГ-ММ-ДД' и время из ISO (UTC), sport.ru - '10 октября 2025' и 'ЧЧ:ММ'.
+Все они приводятся к ISO 8601 с поясом Москвы ('2025-10-10T12:00:00+03:00'):
+в одном поясе такие строки сортируются как время, поэтому ленты можно сливать и листать.
+
+Поле published карточки (news_item.NewsItem) заполняет Source.extract_news();
+источник с точным временем (например, ISO-атрибут datetime у Habr) может задать его сам.
+Пустая строка - время не удалось определить.
+
+
+- parse_published(date, time='', now=None) -> Optional[datetime]: дата и время карточки -> datetime с поясом
+- normalize(date, time='', now=None) -> str: то же в виде ISO-строки ('' если не распознано)
+- to_iso(value: datetime) -> str: ISO-строка в поясе Москвы
+- from_iso(value: str) -> Optional[datetime]: обратное преобразование
+"""
+
+
+RU_MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
+    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
+}
+
+DOTTED_DATE_RE = re.compile(r'^(\d{1,2})\.(\d{1,2})\.(\d{4})')
+ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+WORD_DATE_RE = re.compile(r'^(\d{1,2})\s+([а-яё]+)(?:\s+(\d{4}))?')
+TIME_RE = re.compile(r'(\d{1,2}):(\d{2})')
+
+
+def _parse_day(text: str, today: Date) -> Optional[Date]:
+    text = text.strip().lower()
+    if text == 'сегодня':
+        return today
+    if text == 'вчера':
+        return today - timedelta(days=1)
+
+    match = DOTTED_DATE_RE.match(text)
+    if match:
+        return Date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+
+    match = ISO_DATE_RE.match(text)
+    if match:
+        return Date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    match = WORD_DATE_RE.match(text)
+    if match and match.group(2) in RU_MONTHS:
+        month = RU_MONTHS[match.group(2)]
+        day = int(match.group(1))
+        if match.group(3):
+            return Date(int(match.group(3)), month, day)
+        # Год не указан - текущий, если дата не из будущего (иначе это декабрь прошлого года)
+        result = Date(today.year, month, day)
+        if result > today + timedelta(days=1):
+            result = Date(today.year - 1, month, day)
+        return result
+
+    return None
+
+
+def parse_published(date: str, time: str = '', now: Optional[datetime] = None) -> Optional[datetime]:
+    now = now.astimezone(MOSCOW) if now else datetime.now(MOSCOW)
+    time_match = TIME_RE.search(time or '')
+
+    try:
+        if date:
+            day = _parse_day(date, now.date())
+        else:
+            # Только время - значит, сегодня (так RIA показывает свежие новости)
+            day = now.date() if time_match else None
+        if day is None:
+            return None
+
+        hour, minute = (int(time_match.group(1)), int(time_match.group(2))) if time_match else (0, 0)
+        return datetime(day.year, day.month, day.day, hour, minute, tzinfo=MOSCOW)
+    except ValueError:  # 31.02.2025, 25:00 и т.п.
+        return None
+
+
+def to_iso(value: datetime) -> str:
+    return value.astimezone(MOSCOW).isoformat(timespec='seconds')
+
+
+def normalize(date: str, time: str = '', now: Optional[datetime] = None) -> str:
+    published = parse_published(date, time, now)
+    return to_iso(published) if published else ''
+
+
+def from_iso(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None